@@ -0,0 +1,118 @@
+"""
+SMS gateway used by send_sms_task.
+
+    get_gateway().send('+998901234567', "Tasdiqlash kodi: 123456")
+
+Each process keeps one client (SMS_GATEWAY): it logs in once and reuses the
+token until shortly before it expires, sends over a pooled keep-alive HTTP
+session, and logs in again if the provider answers 401.
+"""
+import logging
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+class SMSError(Exception):
+    pass
+
+
+class EskizGateway:
+    """Client for the Eskiz (notify.eskiz.uz) API"""
+
+    # Seconds before expiry at which a token is replaced
+    TOKEN_LEEWAY = 60
+
+    def __init__(self, base_url=None, email=None, password=None, sender=None, timeout=None, pool_size=None):
+        self.base_url = (base_url or settings.ESKIZ_BASE_URL).rstrip('/')
+        self.email = email or settings.ESKIZ_EMAIL
+        self.password = password or settings.ESKIZ_PASSWORD
+        self.sender = sender or settings.ESKIZ_SENDER
+        self.timeout = timeout or settings.SMS_GATEWAY_TIMEOUT
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or settings.SMS_GATEWAY_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._token = None
+        self._token_expires_at = 0
+        self._token_lock = threading.Lock()
+
+    def send(self, phone_number, message):
+        """Send one SMS; returns the provider's response data"""
+        data = {'mobile_phone': phone_number.lstrip('+'), 'message': message, 'from': self.sender}
+
+        token = self.get_token()
+        response = self._post('/message/sms/send', data, token)
+        if response.status_code == 401:
+            # Revoked or expired early: log in again, once
+            response = self._post('/message/sms/send', data, self.get_token(stale=token))
+
+        if not response.ok:
+            raise SMSError(f"SMS yuborilmadi ({response.status_code}): {response.text[:200]}")
+        return response.json()
+
+    def get_token(self, stale=None):
+        """The cached token; a new one after expiry or when `stale` is the one the provider rejected"""
+        with self._token_lock:
+            expired = time.time() >= self._token_expires_at - self.TOKEN_LEEWAY
+            if self._token is None or expired or self._token == stale:
+                self._token, self._token_expires_at = self._login()
+            return self._token
+
+    def _login(self):
+        response = self.session.post(
+            f"{self.base_url}/auth/login",
+            data={'email': self.email, 'password': self.password},
+            timeout=self.timeout
+        )
+        if not response.ok:
+            raise SMSError(f"SMS provayderiga kirib bo'lmadi ({response.status_code})")
+
+        token = response.json()['data']['token']
+        logger.info("Eskiz token refreshed")
+        return token, self._expires_at(token)
+
+    def _expires_at(self, token):
+        try:
+            return jwt.decode(token, options={'verify_signature': False})['exp']
+        except (jwt.PyJWTError, KeyError):
+            return time.time() + settings.ESKIZ_TOKEN_LIFETIME
+
+    def _post(self, path, data, token):
+        return self.session.post(
+            f"{self.base_url}{path}",
+            data=data,
+            headers={'Authorization': f"Bearer {token}"},
+            timeout=self.timeout
+        )
+
+
+def get_gateway():
+    """The process-wide gateway client"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = import_string(settings.SMS_GATEWAY)()
+        return _gateway
+
+
+@receiver(setting_changed)
+def reset_gateway(setting, **kwargs):
+    global _gateway
+    if setting == 'SMS_GATEWAY' or setting.startswith('ESKIZ_'):
+        with _gateway_lock:
+            _gateway = None
@@ -4,8 +4,8 @@ import random
 import boto3
 from celery import shared_task
 from config.celery import app
-from django.conf import settings
-from eskiz_sms import EskizSMS
+
+from .sms import get_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -14,15 +14,10 @@ logger = logging.getLogger(__name__)
 def send_sms_task(self, phone_number, code):
 
     try:
-        eskiz = EskizSMS(email=settings.ESKIZ_EMAIL, password=settings.ESKIZ_PASSWORD)
-
         message = f"Your verification code is: {code}. Valid for 5 minutes."
 
-        response = eskiz.send_sms(
-            phone_number,
-            message=message,
-            from_whom="4546"
-        )
+        # Reuses this worker's token and connections instead of logging in for every SMS
+        response = get_gateway().send(phone_number, message)
 
         logger.info(f"✅ SMS sent successfully to {phone_number}: {response}")
         return response
@@ -1,3 +1,125 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
 
-# Create your tests here.
+import jwt
+from django.test import SimpleTestCase, override_settings
+
+from .sms import EskizGateway, SMSError, get_gateway
+from .tasks import send_sms_task
+
+
+class FakeEskizServer:
+    """Local stand-in for the Eskiz API: issues tokens, accepts SMS and counts logins and connections"""
+
+    def __init__(self, token_lifetime=3600):
+        self.token_lifetime = token_lifetime
+        self.valid_tokens = set()
+        self.logins = 0
+        self.connections = set()
+        self.sent = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                server.connections.add(self.client_address)
+                length = int(self.headers.get('Content-Length', 0))
+                data = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+
+                if self.path == '/auth/login':
+                    if data.get('password') != 'secret':
+                        return self.respond(401, {'message': 'Invalid credentials'})
+                    return self.respond(200, {'data': {'token': server.issue_token()}})
+
+                if self.path == '/message/sms/send':
+                    token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+                    if token not in server.valid_tokens:
+                        return self.respond(401, {'message': 'Expired'})
+                    server.sent.append(data)
+                    return self.respond(200, {'id': str(len(server.sent)), 'status': 'waiting'})
+
+                self.respond(404, {})
+
+            def respond(self, status, body):
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def issue_token(self):
+        self.logins += 1
+        token = jwt.encode({'sub': self.logins, 'exp': int(time.time()) + self.token_lifetime}, 'key')
+        self.valid_tokens.add(token)
+        return token
+
+    def revoke_tokens(self):
+        self.valid_tokens.clear()
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SMSGatewayTests(SimpleTestCase):
+
+    def gateway(self, server, **kwargs):
+        return EskizGateway(base_url=server.url, email='test@example.com', password='secret', **kwargs)
+
+    def test_token_and_connection_are_reused(self):
+        with FakeEskizServer() as server:
+            gateway = self.gateway(server)
+            for i in range(20):
+                gateway.send('+998901234567', f"Kod {i}")
+
+        self.assertEqual(len(server.sent), 20)
+        self.assertEqual(server.sent[0], {'mobile_phone': '998901234567', 'message': 'Kod 0', 'from': '4546'})
+        self.assertEqual(server.logins, 1)
+        self.assertEqual(len(server.connections), 1)
+
+    def test_token_is_refreshed_on_401_and_near_expiry(self):
+        with FakeEskizServer() as server:
+            gateway = self.gateway(server)
+            gateway.send('998901234567', "Kod")
+            server.revoke_tokens()
+            gateway.send('998901234567', "Kod")
+            self.assertEqual((server.logins, len(server.sent)), (2, 2))
+
+        with FakeEskizServer(token_lifetime=EskizGateway.TOKEN_LEEWAY - 1) as server:
+            gateway = self.gateway(server)
+            gateway.send('998901234567', "Kod")
+            gateway.send('998901234567', "Kod")
+            self.assertEqual(server.logins, 2)
+
+    def test_failed_login_raises(self):
+        with FakeEskizServer() as server:
+            with self.assertRaises(SMSError):
+                EskizGateway(base_url=server.url, email='test@example.com', password='wrong').send('998901234567', "Kod")
+        self.assertEqual(server.sent, [])
+
+    def test_task_uses_the_process_wide_gateway(self):
+        with FakeEskizServer() as server:
+            with override_settings(ESKIZ_BASE_URL=server.url, ESKIZ_PASSWORD='secret'):
+                self.assertIs(get_gateway(), get_gateway())
+                for code in ('111111', '222222', '333333'):
+                    send_sms_task.apply(args=['+998901234567', code]).get()
+
+        self.assertEqual(len(server.sent), 3)
+        self.assertIn('333333', server.sent[-1]['message'])
+        self.assertEqual(server.logins, 1)
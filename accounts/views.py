@@ -2,7 +2,7 @@ import random
 import string
 from datetime import timedelta
 
-from django.core.cache import cache
+from config.cache import signup_cache
 from django.db import IntegrityError, transaction
 from django.utils import timezone
 from drf_yasg import openapi
@@ -75,7 +75,7 @@ class SignupStep1View(APIView):
                 result = serializer.save()
 
                 cache_key = f"signup_data_{result['verification_id']}"
-                cache.set(cache_key, result['user_data'], timeout=300)
+                signup_cache.set(cache_key, result['user_data'])
 
                 return Response({
                     'success': True,
@@ -114,7 +114,7 @@ class SignupStep2View(APIView):
 
                 # Get the cached user data
                 cache_key = f"signup_data_{verification_id}"
-                cached_user_data = cache.get(cache_key)
+                cached_user_data = signup_cache.get(cache_key)
 
 
                 if not cached_user_data:
@@ -127,7 +127,7 @@ class SignupStep2View(APIView):
                 user = serializer.create_user(cached_user_data, verification)
 
                 # Clear cached data
-                cache.delete(cache_key)
+                signup_cache.delete(cache_key)
 
                 # Generate tokens for immediate login
                 tokens = user.token()
@@ -183,7 +183,7 @@ class ResendSMSView(APIView):
         try:
             # Get cached user data
             cache_key = f"signup_data_{verification_id}"
-            cached_data = cache.get(cache_key)
+            cached_data = signup_cache.get(cache_key)
 
             if not cached_data:
                 return Response({
@@ -207,8 +207,8 @@ class ResendSMSView(APIView):
 
             # Update cache with new verification_id
             new_cache_key = f"signup_data_{new_verification.id}"
-            cache.set(new_cache_key, cached_data, timeout=300)
-            cache.delete(cache_key)  # Remove old cache
+            signup_cache.set(new_cache_key, cached_data)
+            signup_cache.delete(cache_key)  # Remove old cache
 
             # Send SMS
             send_sms_task.delay(phone_number, code)
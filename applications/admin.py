@@ -1,5 +1,26 @@
-from django.contrib import admin
+from collections import Counter
+
+from django.contrib import admin, messages
 from applications.models import Application, File, Reward
+from applications.transitions import NOT_ALLOWED, TRANSITIONED, UNCHANGED, bulk_transition
+
+
+def make_transition_action(new_status, label):
+    def action(modeladmin, request, queryset):
+        outcomes = bulk_transition(list(queryset.values_list('pk', flat=True)), new_status)
+        summary = Counter(outcomes.values())
+        modeladmin.message_user(
+            request,
+            f"{label}: {summary[TRANSITIONED]} ta o'tkazildi, "
+            f"{summary[UNCHANGED]} ta allaqachon shu holatda, "
+            f"{summary[NOT_ALLOWED]} ta o'tkazib bo'lmaydi",
+            messages.SUCCESS if summary[TRANSITIONED] else messages.WARNING
+        )
+
+    action.__name__ = f'transition_to_{new_status}'
+    action.short_description = f"Holatni o'zgartirish: {label}"
+    return action
+
 
 class ApplicationAdmin(admin.ModelAdmin):
     list_display = [
@@ -8,6 +29,11 @@ class ApplicationAdmin(admin.ModelAdmin):
     search_fields = ['id', 'user', 'reward']
     list_display_links = ['id', 'user',]
     list_per_page = 1000
+    # One UPDATE per action however many rows are selected (see applications.transitions)
+    actions = [
+        make_transition_action(status, label)
+        for status, label in Application.STATUS_CHOICES if status != 'yuborilgan'
+    ]
 
 
 class RewardAdmin(admin.ModelAdmin):
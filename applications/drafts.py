@@ -0,0 +1,213 @@
+import json
+import logging
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import ChunkedUpload, DraftFile
+from .storage import is_temp_path
+from .uploads import TEMP_UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+DRAFT_CACHE_ALIAS = 'drafts'
+DRAFT_FIELDS = ['step1_data', 'step2_data', 'step3_data', 'current_step', 'reward_id']
+
+# One connection pool per Redis URL, shared by every DraftStore of the process
+_redis_clients = {}
+
+
+def encode(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+def decode(value):
+    if isinstance(value, bytes):
+        value = value.decode()
+    return json.loads(value)
+
+
+class DraftStore:
+    """
+    Multi-step application drafts: one hash per draft, one field per step
+    (see DRAFT_FIELDS), values encoded as compact JSON.
+
+    Saving a step writes only its own fields (HSET), so steps saved from two
+    tabs no longer overwrite each other, and reading one step fetches one
+    field (HGET). Every write refreshes the TTL of the whole draft.
+    Non-Redis cache backends keep each field under its own cache key.
+    """
+
+    def __init__(self, alias=DRAFT_CACHE_ALIAS):
+        self.alias = alias
+        self.cache = caches[alias]
+        self.is_redis = isinstance(self.cache, RedisCache)
+
+    def get(self, key):
+        """The whole draft as a dict (empty if there is none)"""
+        return self.get_fields(key, *DRAFT_FIELDS)
+
+    def get_field(self, key, field, default=None):
+        return self.get_fields(key, field).get(field, default)
+
+    def get_fields(self, key, *fields):
+        if self.is_redis:
+            client, hash_key = self._client(key)
+            values = client.hmget(hash_key, fields)
+            return {field: decode(value) for field, value in zip(fields, values) if value is not None}
+
+        values = self.cache.get_many([self._field_key(key, field) for field in fields])
+        return {
+            field: decode(values[self._field_key(key, field)])
+            for field in fields if self._field_key(key, field) in values
+        }
+
+    def update(self, key, fields):
+        """Atomically write the given fields, leaving the rest of the draft untouched"""
+        encoded = {field: encode(value) for field, value in fields.items()}
+        timeout = self.cache.default_timeout
+
+        if self.is_redis:
+            client, hash_key = self._client(key)
+            with client.pipeline() as pipe:
+                pipe.hset(hash_key, mapping=encoded)
+                pipe.expire(hash_key, timeout)
+                pipe.execute()
+            return
+
+        self.cache.set_many({self._field_key(key, field): value for field, value in encoded.items()}, timeout)
+        # Keep the other fields alive as long as the draft is being edited
+        for field in DRAFT_FIELDS:
+            if field not in encoded:
+                self.cache.touch(self._field_key(key, field), timeout)
+
+    def delete(self, key):
+        if self.is_redis:
+            client, hash_key = self._client(key)
+            client.delete(hash_key)
+            return
+        self.cache.delete_many([self._field_key(key, field) for field in DRAFT_FIELDS])
+
+    def _client(self, key):
+        """A redis-py client for the cache's server (its LOCATION) and the prefixed key of the draft hash"""
+        # With several servers RedisCache writes to the first one
+        location = settings.CACHES[self.alias]['LOCATION'].split(',')[0]
+        if location not in _redis_clients:
+            _redis_clients[location] = redis.Redis.from_url(location)
+        return _redis_clients[location], self.cache.make_and_validate_key(key)
+
+    def _field_key(self, key, field):
+        return f"{key}:{field}"
+
+
+def draft_ttl():
+    return timedelta(seconds=caches[DRAFT_CACHE_ALIAS].default_timeout)
+
+
+def register_draft_files(key, user, files):
+    """
+    Track the temp files saved by step 3 of a draft. Files of an earlier
+    step 3 save that are no longer referenced expire immediately.
+    """
+    paths = [data['file_path'] for data in files]
+    DraftFile.objects.filter(draft_key=key).exclude(file_path__in=paths).update(expires_at=timezone.now())
+
+    expires_at = timezone.now() + draft_ttl()
+    DraftFile.objects.bulk_create([
+        DraftFile(
+            draft_key=key,
+            user=user,
+            file_path=data['file_path'],
+            file_size=data.get('file_size') or 0,
+            expires_at=expires_at
+        )
+        for data in files
+    ], update_conflicts=True, unique_fields=['file_path'], update_fields=['draft_key', 'expires_at'])
+
+
+def touch_draft_files(key):
+    """Keep a draft's files alive as long as the draft itself"""
+    now = timezone.now()
+    DraftFile.objects.filter(draft_key=key, expires_at__gt=now).update(expires_at=now + draft_ttl())
+
+
+def expire_draft_files(key):
+    """Hand a discarded draft's files to the next sweep"""
+    DraftFile.objects.filter(draft_key=key).update(expires_at=timezone.now())
+
+
+def release_draft_files(key):
+    """Stop tracking the files of a submitted draft; submission moves them out of temp storage"""
+    DraftFile.objects.filter(draft_key=key).delete()
+
+
+def sweep_temp_uploads(now=None, batch_size=None):
+    """
+    Delete temp uploads nobody needs any more, in batches:
+
+    - files of expired drafts (DraftFile.expires_at in the past);
+    - chunked uploads not touched for a draft TTL (attached ones only lose
+      their row, their file belongs to the draft);
+    - files in temp_uploads/ that nothing references and that are older than
+      TEMP_UPLOAD_ORPHAN_AGE (e.g. left by a failed submission).
+
+    Returns {'files': deleted files, 'bytes': reclaimed bytes}.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.TEMP_UPLOAD_SWEEP_BATCH_SIZE
+    reclaimed = {'files': 0, 'bytes': 0}
+
+    while True:
+        batch = list(
+            DraftFile.objects.filter(expires_at__lte=now).order_by('pk').values_list('pk', 'file_path')[:batch_size]
+        )
+        if not batch:
+            break
+        for _, file_path in batch:
+            _delete_temp_file(file_path, reclaimed)
+        DraftFile.objects.filter(pk__in=[pk for pk, _ in batch]).delete()
+
+    stale_before = now - draft_ttl()
+    while True:
+        batch = list(
+            ChunkedUpload.objects.filter(updated_at__lte=stale_before)
+            .order_by('pk').values_list('pk', 'file_path', 'status')[:batch_size]
+        )
+        if not batch:
+            break
+        for _, file_path, status in batch:
+            if status != 'attached':
+                _delete_temp_file(file_path, reclaimed)
+        ChunkedUpload.objects.filter(pk__in=[pk for pk, _, _ in batch]).delete()
+
+    try:
+        _, names = default_storage.listdir(TEMP_UPLOAD_DIR)
+    except FileNotFoundError:
+        names = []
+
+    orphaned_before = now - timedelta(seconds=settings.TEMP_UPLOAD_ORPHAN_AGE)
+    for start in range(0, len(names), batch_size):
+        paths = [f"{TEMP_UPLOAD_DIR}/{name}" for name in names[start:start + batch_size]]
+        referenced = set(DraftFile.objects.filter(file_path__in=paths).values_list('file_path', flat=True))
+        referenced.update(ChunkedUpload.objects.filter(file_path__in=paths).values_list('file_path', flat=True))
+        for path in paths:
+            if path not in referenced and default_storage.get_modified_time(path) <= orphaned_before:
+                _delete_temp_file(path, reclaimed)
+
+    logger.info(f"Temp upload sweep: deleted {reclaimed['files']} files, reclaimed {reclaimed['bytes']} bytes")
+    return reclaimed
+
+
+def _delete_temp_file(path, reclaimed):
+    if not is_temp_path(path) or not default_storage.exists(path):
+        return
+    size = default_storage.size(path)
+    default_storage.delete(path)
+    reclaimed['files'] += 1
+    reclaimed['bytes'] += size
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from applications.models import RewardStats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-reward application counters (RewardStats) from the Application table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('reward_ids', nargs='*', type=int, help="Only rebuild these rewards")
+
+    def handle(self, *args, **options):
+        reward_ids = options['reward_ids'] or None
+        count = RewardStats.rebuild(reward_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} reward(s)"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from applications.models import Application
+from applications.search import index_applications
+
+
+class Command(BaseCommand):
+    help = "Rebuild the application search documents (and the full-text index kept in sync with them)"
+
+    def handle(self, *args, **options):
+        count = index_applications(Application.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} application(s)"))
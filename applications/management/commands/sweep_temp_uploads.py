@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from applications.drafts import sweep_temp_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete temp uploads of expired drafts, stale chunked uploads and unreferenced temp files"
+
+    def handle(self, *args, **options):
+        reclaimed = sweep_temp_uploads()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {reclaimed['files']} file(s), reclaimed {reclaimed['bytes']} bytes"
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_reward_stats(apps, schema_editor):
+    Reward = apps.get_model('applications', 'Reward')
+    Application = apps.get_model('applications', 'Application')
+    RewardStats = apps.get_model('applications', 'RewardStats')
+
+    stats = {pk: RewardStats(reward_id=pk) for pk in Reward.objects.values_list('pk', flat=True)}
+    rows = Application.objects.order_by().values('reward_id', 'status').annotate(count=Count('id'))
+    for row in rows:
+        item = stats[row['reward_id']]
+        setattr(item, row['status'], row['count'])
+        item.total += row['count']
+    RewardStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0005_alter_application_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RewardStats',
+            fields=[
+                ('reward', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='applications.reward')),
+                ('total', models.IntegerField(default=0)),
+                ('yuborilgan', models.IntegerField(default=0)),
+                ('mahalla', models.IntegerField(default=0)),
+                ('tuman', models.IntegerField(default=0)),
+                ('hudud', models.IntegerField(default=0)),
+                ('oxirgi_tasdiqlash', models.IntegerField(default=0)),
+                ('mukofotlangan', models.IntegerField(default=0)),
+                ('rad_etilgan', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Reward stats',
+                'verbose_name_plural': 'Reward stats',
+            },
+        ),
+        migrations.RunPython(build_reward_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE applications_search_fts USING fts5(
+        document,
+        content='applications_applicationsearchdocument',
+        content_rowid='application_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER applications_search_fts_ai AFTER INSERT ON applications_applicationsearchdocument BEGIN
+        INSERT INTO applications_search_fts(rowid, document) VALUES (new.application_id, new.document);
+    END
+    """,
+    """
+    CREATE TRIGGER applications_search_fts_ad AFTER DELETE ON applications_applicationsearchdocument BEGIN
+        INSERT INTO applications_search_fts(applications_search_fts, rowid, document)
+        VALUES ('delete', old.application_id, old.document);
+    END
+    """,
+    """
+    CREATE TRIGGER applications_search_fts_au AFTER UPDATE ON applications_applicationsearchdocument BEGIN
+        INSERT INTO applications_search_fts(applications_search_fts, rowid, document)
+        VALUES ('delete', old.application_id, old.document);
+        INSERT INTO applications_search_fts(rowid, document) VALUES (new.application_id, new.document);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS applications_search_fts_au",
+    "DROP TRIGGER IF EXISTS applications_search_fts_ad",
+    "DROP TRIGGER IF EXISTS applications_search_fts_ai",
+    "DROP TABLE IF EXISTS applications_search_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX applications_search_document_gin ON applications_applicationsearchdocument "
+    "USING GIN (to_tsvector('simple', document))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS applications_search_document_gin",
+]
+
+
+def run_statements(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def build_search_documents(apps, schema_editor):
+    Application = apps.get_model('applications', 'Application')
+    ApplicationSearchDocument = apps.get_model('applications', 'ApplicationSearchDocument')
+
+    documents = []
+    for application in Application.objects.select_related('user', 'reward').iterator():
+        user = application.user
+        parts = [user.first_name, user.last_name, user.pinfl, application.reward.name]
+        documents.append(ApplicationSearchDocument(
+            application_id=application.pk,
+            pinfl=user.pinfl or '',
+            document=' '.join(part for part in parts if part)
+        ))
+    ApplicationSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0006_rewardstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationSearchDocument',
+            fields=[
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='applications.application')),
+                ('pinfl', models.CharField(db_index=True, max_length=14)),
+                ('document', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Application search document',
+                'verbose_name_plural': 'Application search documents',
+            },
+        ),
+        migrations.RunPython(
+            run_statements({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run_statements({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0009_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='submission_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='submission_status',
+            field=models.CharField(choices=[('processing', 'Qayta ishlanmoqda'), ('completed', 'Yakunlangan'), ('failed', 'Xatolik')], default='completed', max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0010_application_submission_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DraftFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('draft_key', models.CharField(db_index=True, max_length=255)),
+                ('file_path', models.CharField(max_length=255, unique=True)),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draft_files', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Draft file',
+                'verbose_name_plural': 'Draft files',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
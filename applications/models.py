@@ -1,4 +1,8 @@
+import uuid
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, Count, F, Value, When
 
 from accounts.models import CustomUser
 
@@ -56,6 +60,13 @@ class Certificates(models.Model):
         db_table = 'certificates'
 
 
+class ApplicationQuerySet(models.QuerySet):
+
+    def submitted(self):
+        """Applications whose submission finished; processing and failed ones are only reservations"""
+        return self.filter(submission_status='completed')
+
+
 class Application(models.Model):
     STATUS_CHOICES = (
         ('yuborilgan', 'Yuborilgan'),
@@ -67,6 +78,12 @@ class Application(models.Model):
         ('rad_etilgan', 'Rad etilgan'),
     )
 
+    SUBMISSION_STATUS_CHOICES = (
+        ('processing', 'Qayta ishlanmoqda'),
+        ('completed', 'Yakunlangan'),
+        ('failed', 'Xatolik'),
+    )
+
     AREA_CHOICES = (
         ('Andijon', 'Andijon viloyati'),
         ('Buxoro', 'Buxoro viloyati'),
@@ -94,9 +111,14 @@ class Application(models.Model):
     activity_description = models.TextField()
     recommendation_letter = models.FileField(upload_to='recommendation/', null=True, blank=True)
     source = models.CharField(max_length=200, null=True, blank=True)
+    # Progress of an asynchronous submission (files and notifications), separate from the review status
+    submission_status = models.CharField(max_length=20, choices=SUBMISSION_STATUS_CHOICES, default='completed')
+    submission_error = models.TextField(blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ApplicationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Application'
@@ -108,11 +130,24 @@ class Application(models.Model):
                 name='unique_user_reward_application'
             )
         ]
+        # Matched to the listing/stats filters; all of them end in created_at so
+        # the '-created_at' ordering is served by the index without a sort
+        indexes = [
+            models.Index(fields=['reward', 'status', 'created_at'], name='app_reward_status_created_idx'),
+            models.Index(fields=['reward', 'created_at'], name='app_reward_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='app_status_created_idx'),
+            models.Index(fields=['area', 'status', 'created_at'], name='app_area_status_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='app_user_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='app_created_id_idx'),
+        ]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Track the original status to detect changes
+        # Track the original status and reward to detect changes
         self._original_status = self.status if self.pk else None
+        self._original_reward_id = self.reward_id if self.pk else None
+        self._original_user_id = self.user_id if self.pk else None
+        self._original_submission_status = self.submission_status if self.pk else None
 
     def save(self, *args, **kwargs):
         # Check if this is an update and if status changed
@@ -127,33 +162,233 @@ class Application(models.Model):
         # Save the instance
         super().save(*args, **kwargs)
 
-        # Handle notifications after save
-        if is_new:
-            # New application created - handled by signals
-            pass
-        elif is_status_change and old_status:
-            # Status changed - handle notification
-            self._handle_status_change_notification(old_status)
-
-        # Update the tracked status
+        # Keep per-reward counters in sync; only completed submissions are counted
+        was_submitted = not is_new and self._original_submission_status == 'completed'
+        if self.submission_status == 'completed':
+            if not was_submitted:
+                RewardStats.apply_delta(self.reward_id, {self.status: 1})
+            elif old_status and (is_status_change or self._original_reward_id != self.reward_id):
+                RewardStats.apply_delta(self._original_reward_id, {old_status: -1})
+                RewardStats.apply_delta(self.reward_id, {self.status: 1})
+
+        # Status change hooks and notifications (new applications are notified by signals)
+        if is_status_change and old_status:
+            from .transitions import status_changed
+            status_changed(self, old_status)
+
+        # Update the tracked status and reward
         self._original_status = self.status
+        self._original_reward_id = self.reward_id
+        self._original_user_id = self.user_id
+        self._original_submission_status = self.submission_status
 
-    def _handle_status_change_notification(self, old_status):
-        """Handle status change notifications"""
-        from notifications.services import NotificationService
+    def clean(self):
+        from .transitions import can_transition
 
-        new_status = self.status
-        in_process_statuses = ['mahalla', 'tuman', 'hudud',]
+        old_status = self._original_status
+        if old_status and old_status != self.status and not can_transition(old_status, self.status):
+            raise ValidationError({
+                'status': f"'{self.get_status_display()}' holatiga o'tkazib bo'lmaydi"
+            })
 
-        if new_status in in_process_statuses:
-            NotificationService.create_application_in_process_notification(self, old_status)
-        elif new_status == "oxirgi_tasdiqlash":
-            NotificationService.create_application_last_process_notification(self)
-        elif new_status == 'mukofotlangan':
-            NotificationService.create_application_won_notification(self)
-        elif new_status == 'rad_etilgan':
-            NotificationService.create_application_rejected_notification(self)
+    def __str__(self):
+        return f"{self.user.get_full_name}'s application"
 
 
+class RewardStats(models.Model):
+    """
+    Denormalized application counters per reward.
+
+    Updated incrementally from Application.save and the post_delete signal,
+    rebuilt from scratch with `manage.py rebuild_reward_stats`.
+    """
+    PENDING_STATUSES = ['yuborilgan', 'mahalla', 'tuman', 'hudud']
+    APPROVED_STATUS = 'mukofotlangan'
+
+    reward = models.OneToOneField(Reward, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total = models.IntegerField(default=0)
+    yuborilgan = models.IntegerField(default=0)
+    mahalla = models.IntegerField(default=0)
+    tuman = models.IntegerField(default=0)
+    hudud = models.IntegerField(default=0)
+    oxirgi_tasdiqlash = models.IntegerField(default=0)
+    mukofotlangan = models.IntegerField(default=0)
+    rad_etilgan = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Reward stats'
+        verbose_name_plural = 'Reward stats'
+
     def __str__(self):
-        return f"{self.user.get_full_name}'s application"
+        return f"{self.reward_id}: {self.total}"
+
+    @property
+    def pending(self):
+        return sum(getattr(self, status) for status in self.PENDING_STATUSES)
+
+    @property
+    def approved(self):
+        return getattr(self, self.APPROVED_STATUS)
+
+    @classmethod
+    def apply_delta(cls, reward_id, deltas):
+        """
+        Atomically add deltas ({status: +1/-1}) to the reward's counters.
+        Falls back to a rebuild if the row does not exist yet.
+        """
+        updates = {status: F(status) + delta for status, delta in deltas.items() if delta}
+        total_delta = sum(deltas.values())
+        if total_delta:
+            updates['total'] = F('total') + total_delta
+        if not updates:
+            return
+
+        if not cls.objects.filter(reward_id=reward_id).update(**updates):
+            cls.rebuild([reward_id])
+
+    @classmethod
+    def apply_bulk_delta(cls, deltas):
+        """
+        apply_delta for many rewards in one UPDATE: deltas is {reward_id: {status: delta}}.
+        Rewards without a stats row are rebuilt.
+        """
+        deltas = {
+            reward_id: {status: delta for status, delta in reward_deltas.items() if delta}
+            for reward_id, reward_deltas in deltas.items()
+        }
+        deltas = {reward_id: reward_deltas for reward_id, reward_deltas in deltas.items() if reward_deltas}
+        if not deltas:
+            return
+
+        fields = {status for reward_deltas in deltas.values() for status in reward_deltas}
+        updates = {}
+        for field in fields:
+            whens = [
+                When(reward_id=reward_id, then=Value(reward_deltas[field]))
+                for reward_id, reward_deltas in deltas.items() if field in reward_deltas
+            ]
+            updates[field] = F(field) + Case(*whens, default=Value(0))
+
+        totals = [
+            When(reward_id=reward_id, then=Value(sum(reward_deltas.values())))
+            for reward_id, reward_deltas in deltas.items() if sum(reward_deltas.values())
+        ]
+        if totals:
+            updates['total'] = F('total') + Case(*totals, default=Value(0))
+
+        if cls.objects.filter(reward_id__in=deltas.keys()).update(**updates) < len(deltas):
+            existing = set(cls.objects.filter(reward_id__in=deltas.keys()).values_list('reward_id', flat=True))
+            cls.rebuild([reward_id for reward_id in deltas if reward_id not in existing])
+
+    @classmethod
+    def rebuild(cls, reward_ids=None):
+        """Recompute counters from the Application table with one grouped query"""
+        rewards = Reward.objects.all()
+        applications = Application.objects.submitted()
+        if reward_ids is not None:
+            rewards = rewards.filter(pk__in=reward_ids)
+            applications = applications.filter(reward_id__in=reward_ids)
+
+        stats = {reward_id: cls(reward_id=reward_id) for reward_id in rewards.values_list('pk', flat=True)}
+        rows = applications.order_by().values('reward_id', 'status').annotate(count=Count('id'))
+        for row in rows:
+            item = stats.get(row['reward_id'])
+            if item is None:
+                continue
+            setattr(item, row['status'], row['count'])
+            item.total += row['count']
+
+        cls.objects.bulk_create(
+            stats.values(),
+            update_conflicts=True,
+            unique_fields=['reward'],
+            update_fields=['total', 'updated_at'] + [status for status, _ in Application.STATUS_CHOICES],
+        )
+        return len(stats)
+
+
+class ApplicationSearchDocument(models.Model):
+    """
+    Denormalized search text per application (applicant name, PINFL, reward name).
+
+    Kept in sync by applications.signal; the full-text index on top of it is
+    backend specific (see applications.search).
+    """
+    application = models.OneToOneField(
+        Application, on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+    pinfl = models.CharField(max_length=14, db_index=True)
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Application search document'
+        verbose_name_plural = 'Application search documents'
+
+    def __str__(self):
+        return self.document
+
+
+class ChunkedUpload(models.Model):
+    """
+    Resumable upload written chunk by chunk to temp_uploads/.
+    Completed uploads are referenced from step 3 by id instead of re-sending the file.
+    """
+    STATUS_CHOICES = (
+        ('uploading', 'Uploading'),
+        ('completed', 'Completed'),
+        ('attached', 'Attached to a draft'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Chunked upload'
+        verbose_name_plural = 'Chunked uploads'
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size})"
+
+    @property
+    def is_complete(self):
+        return self.offset == self.total_size
+
+    def as_file_data(self):
+        """File metadata in the format stored in the draft's step 3 data"""
+        return {
+            'original_name': self.filename,
+            'file_path': self.file_path,
+            'file_size': self.total_size
+        }
+
+
+class DraftFile(models.Model):
+    """
+    Temp file in temp_uploads/ referenced by an application draft.
+    Expires together with the draft; expired files are deleted by
+    applications.drafts.sweep_temp_uploads.
+    """
+    draft_key = models.CharField(max_length=255, db_index=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='draft_files')
+    file_path = models.CharField(max_length=255, unique=True)
+    file_size = models.PositiveBigIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Draft file'
+        verbose_name_plural = 'Draft files'
+
+    def __str__(self):
+        return self.file_path
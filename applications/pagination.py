@@ -0,0 +1,263 @@
+import base64
+import hashlib
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from config.cache import count_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 10
+
+# Query params that select a page rather than filter the listing
+LISTING_IGNORED_PARAMS = ('page', 'page_size', 'cursor', 'with_total')
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, param='page_size'):
+    """page_size from the query string, clamped to 1..APPLICATIONS_MAX_PAGE_SIZE"""
+    try:
+        page_size = int(request.query_params.get(param, default))
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, settings.APPLICATIONS_MAX_PAGE_SIZE))
+
+
+def get_page_number(request, param='page'):
+    try:
+        return max(1, int(request.query_params.get(param, 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def describe_listing(request, view):
+    """
+    What a listing's queryset is built from: the view class, its URL kwargs,
+    the user and the filter params. Pagination params don't change the total.
+    """
+    params = {
+        key: request.query_params.getlist(key)
+        for key in sorted(request.query_params)
+        if key not in LISTING_IGNORED_PARAMS
+    }
+    return {
+        'view': f"{type(view).__module__}.{type(view).__qualname__}",
+        'kwargs': dict(sorted(view.kwargs.items())),
+        'user_id': request.user.pk,
+        'params': params,
+    }
+
+
+def count_cache_key(listing):
+    digest = hashlib.sha1(json.dumps(listing, sort_keys=True, default=str).encode()).hexdigest()
+    return f"application_count_{digest}"
+
+
+def listing_queryset(listing):
+    """
+    Rebuild a listing's filtered queryset outside of its request, from
+    describe_listing() output; None if the user no longer exists.
+    """
+    user = get_user_model()._default_manager.filter(pk=listing['user_id']).first()
+    if user is None:
+        return None
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(urlencode(listing['params'], doseq=True))
+
+    view = import_string(listing['view'])()
+    view.args, view.kwargs = (), listing['kwargs']
+    view.format_kwarg = None
+    view.request = Request(http_request)
+    view.request.user = user
+    return view.filter_queryset(view.get_queryset())
+
+
+def get_total_count(queryset, request=None, view=None):
+    """
+    Total row count for a listing: (count, is_approximate).
+
+    Small result sets are counted exactly every time. Once a count reaches
+    APPLICATIONS_APPROXIMATE_COUNT_THRESHOLD it is cached under the listing's
+    description (see describe_listing) and served from the cache; when older
+    than APPLICATIONS_COUNT_REFRESH_INTERVAL seconds it is recounted in the
+    background by a Celery task while the stale value is served. Without a
+    view there is nothing to rebuild the queryset from, so it is always
+    counted exactly.
+    """
+    if view is None:
+        return queryset.count(), False
+
+    listing = describe_listing(request, view)
+    key = count_cache_key(listing)
+    entry = count_cache.get(key)
+
+    if entry is None:
+        count = queryset.count()
+        if count >= settings.APPLICATIONS_APPROXIMATE_COUNT_THRESHOLD:
+            count_cache.set(key, {'count': count, 'refreshed_at': time.time(), 'listing': listing})
+        return count, False
+
+    is_stale = time.time() - entry['refreshed_at'] > settings.APPLICATIONS_COUNT_REFRESH_INTERVAL
+    if is_stale and count_cache.add(f"{key}_refreshing", True, settings.APPLICATIONS_COUNT_REFRESH_INTERVAL):
+        from .tasks import refresh_count_task
+        try:
+            refresh_count_task.delay(key)
+        except Exception as exc:
+            # The stale count is still served; the next try comes after the refreshing marker expires
+            logger.warning(f"Could not enqueue listing count refresh {key}: {exc!r}")
+
+    return entry['count'], True
+
+
+class ApplicationPagination(BasePagination):
+    """
+    Bounded pagination shared by all application listings.
+
+    Page mode (default): `page` / `page_size`, page_size capped at
+    APPLICATIONS_MAX_PAGE_SIZE, totals from get_total_count().
+
+    Cursor mode (opt-in with a `cursor` query param, empty for the first page):
+    keyset pagination on (created_at, id), newest first. Pages are fetched with
+    a WHERE on the last seen (created_at, id) instead of OFFSET, and
+    `with_total=false` skips counting entirely.
+    """
+    page_query_param = 'page'
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    total_query_param = 'with_total'
+    invalid_cursor_message = "Noto'g'ri cursor"
+
+    def is_cursor_mode(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def encode_cursor(self, obj):
+        raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode()).decode()
+            created_at, pk = raw.split('|')
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        self.page_size = get_page_size(request, param=self.page_size_query_param)
+        self.cursor_mode = self.is_cursor_mode(request)
+        if self.cursor_mode:
+            return self.paginate_by_cursor(queryset, request)
+        return self.paginate_by_page(queryset, request)
+
+    def paginate_by_page(self, queryset, request):
+        self.total_count, self.count_is_approximate = get_total_count(queryset, request, self.view)
+        self.total_pages = max(1, math.ceil(self.total_count / self.page_size))
+        self.page = min(get_page_number(request, self.page_query_param), self.total_pages)
+
+        offset = (self.page - 1) * self.page_size
+        page = list(queryset[offset:offset + self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        return page[:self.page_size]
+
+    def paginate_by_cursor(self, queryset, request):
+        position = self.decode_cursor(request)
+
+        with_total = request.query_params.get(self.total_query_param, 'true').lower() != 'false'
+        if with_total:
+            self.total_count, self.count_is_approximate = get_total_count(queryset, request, self.view)
+        else:
+            self.total_count, self.count_is_approximate = None, False
+
+        queryset = queryset.order_by('-created_at', '-id')
+        if position:
+            created_at, pk = position
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.cursor_mode:
+            return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+        return replace_query_param(url, self.page_query_param, self.page + 1)
+
+    def get_previous_link(self):
+        if self.cursor_mode or self.page <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page - 1)
+
+    def get_pagination_data(self):
+        """Pagination block in the format used by ApplicationsListView"""
+        if self.cursor_mode:
+            return {
+                'next_cursor': self.next_cursor,
+                'has_next': self.has_next,
+                'total_count': self.total_count,
+                'count_is_approximate': self.count_is_approximate,
+                'page_size': self.page_size
+            }
+        return {
+            'current_page': self.page,
+            'total_pages': self.total_pages,
+            'total_count': self.total_count,
+            'count_is_approximate': self.count_is_approximate,
+            'has_next': self.has_next,
+            'has_previous': self.page > 1,
+            'page_size': self.page_size
+        }
+
+    def get_paginated_response(self, data):
+        response = {
+            'count': self.total_count,
+            'count_is_approximate': self.count_is_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        }
+        if self.cursor_mode:
+            response['next_cursor'] = self.next_cursor
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'count_is_approximate': {'type': 'boolean'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,161 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Func
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Application, ApplicationSearchDocument
+
+INDEX_BATCH_SIZE = 500
+
+PINFL_PREFIX_RE = re.compile(r'^\d{1,14}$')
+
+
+def build_document(application):
+    """Search text for an application; user and reward must be loaded"""
+    user = application.user
+    parts = [user.first_name, user.last_name, user.pinfl, application.reward.name]
+    return ' '.join(part for part in parts if part)
+
+
+def index_applications(queryset):
+    """(Re)build search documents for the given applications in batches"""
+    # status and submission_status are read by Application.__init__, so they must not be deferred
+    queryset = queryset.select_related('user', 'reward').only(
+        'id', 'status', 'submission_status', 'user__first_name', 'user__last_name', 'user__pinfl', 'reward__name'
+    ).order_by('pk')
+
+    indexed = 0
+    batch = []
+    for application in queryset.iterator(chunk_size=INDEX_BATCH_SIZE):
+        batch.append(ApplicationSearchDocument(
+            application_id=application.pk,
+            pinfl=application.user.pinfl or '',
+            document=build_document(application)
+        ))
+        if len(batch) >= INDEX_BATCH_SIZE:
+            indexed += _save_documents(batch)
+            batch = []
+
+    if batch:
+        indexed += _save_documents(batch)
+    return indexed
+
+
+def _save_documents(documents):
+    ApplicationSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['application'],
+        update_fields=['pinfl', 'document', 'updated_at'],
+    )
+    return len(documents)
+
+
+def filter_by_pinfl_prefix(queryset, prefix):
+    """
+    Exact-prefix PINFL lookup as a range scan on the indexed pinfl column
+    (pinfl >= '123' AND pinfl < '123:'), which every backend can serve from
+    the B-tree index, unlike LIKE '123%'.
+    """
+    return queryset.filter(
+        search_document__pinfl__gte=prefix,
+        search_document__pinfl__lt=prefix + ':',
+    )
+
+
+class SearchBackend:
+    """Full-text search over ApplicationSearchDocument.document"""
+
+    def search(self, queryset, term):
+        """Return queryset filtered by term, annotated with `search_rank` and ordered best first"""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    SQLite FTS5 external-content table over the search documents.
+    The table and its sync triggers are created by migration 0007.
+    """
+    table = 'applications_search_fts'
+
+    def build_match(self, term):
+        # Every word is a quoted prefix query, so "ali vali" matches "Alisher Valiyev"
+        tokens = re.findall(r'\w+', term)
+        return ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+    def search(self, queryset, term):
+        match = self.build_match(term)
+        if not match:
+            return queryset.none()
+
+        table = self.table
+        pk = f'"{Application._meta.db_table}"."id"'
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [match])
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT bm25({table}) FROM {table} WHERE {table} MATCH %s AND rowid = {pk}',
+                [match]
+            )
+        ).order_by('search_rank', '-created_at')
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    PostgreSQL text search on the document column; migration 0007 adds the
+    matching GIN index on to_tsvector('simple', document).
+    """
+    config = 'simple'
+
+    def vector(self):
+        """
+        to_tsvector(config, document) exactly as indexed. SearchVector would wrap
+        the column in COALESCE(...), which the planner can't match to the index.
+        """
+        from django.contrib.postgres.search import SearchConfig, SearchVectorField
+
+        return Func(
+            SearchConfig(self.config), F('search_document__document'),
+            function='to_tsvector', output_field=SearchVectorField()
+        )
+
+    def search(self, queryset, term):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        tokens = re.findall(r'\w+', term)
+        if not tokens:
+            return queryset.none()
+
+        vector = self.vector()
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config=self.config)
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=SearchRank(vector, query)
+        ).filter(search_vector=query).order_by('-search_rank', '-created_at')
+
+
+BACKENDS_BY_VENDOR = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """APPLICATIONS_SEARCH_BACKEND if set, otherwise the backend matching the database"""
+    if settings.APPLICATIONS_SEARCH_BACKEND:
+        return import_string(settings.APPLICATIONS_SEARCH_BACKEND)()
+    return BACKENDS_BY_VENDOR[connection.vendor]()
+
+
+def search_applications(queryset, term):
+    """
+    Search applications: digit-only terms are PINFL prefixes, anything else
+    goes through the full-text backend. Returns (queryset, mode).
+    """
+    term = term.strip()
+    if PINFL_PREFIX_RE.match(term):
+        return filter_by_pinfl_prefix(queryset, term).order_by('-created_at'), 'pinfl'
+    return get_search_backend().search(queryset, term), 'text'
@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Reward, File, Application, Certificates
+from django.db import transaction
+from .models import Reward, File, Application, Certificates, ChunkedUpload
+from .services import attach_submission_files, enqueue_submission, stage_submission_files
+from .storage import FileStaging
+from .uploads import ALLOWED_EXTENSIONS, MAX_UPLOAD_SIZE
 
 CustomUser = get_user_model()
 
@@ -206,16 +211,24 @@ class ApplicationCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         certificates_data = validated_data.pop('certificates', [])
         user = self.context['request'].user
-        application = Application.objects.create(
-            user=user,
-            **validated_data
-        )
 
-        for certificate_file in certificates_data:
-            Certificates.objects.create(
-                application=application,
-                file=certificate_file
+        # Files are written first and removed again if any INSERT fails
+        with FileStaging() as staging, transaction.atomic():
+            if validated_data.get('recommendation_letter'):
+                validated_data['recommendation_letter'] = staging.save(
+                    Application._meta.get_field('recommendation_letter'),
+                    validated_data['recommendation_letter']
+                )
+            certificate_field = Certificates._meta.get_field('file')
+            certificate_names = [staging.save(certificate_field, f) for f in certificates_data]
+
+            application = Application.objects.create(
+                user=user,
+                **validated_data
             )
+            Certificates.objects.bulk_create([
+                Certificates(application=application, file=name) for name in certificate_names
+            ])
 
         return application
 
@@ -241,6 +254,73 @@ class ApplicationListSerializer(serializers.ModelSerializer):
         ]
 
 
+class ApplicationsListItemSerializer(serializers.ModelSerializer):
+    """
+    Lightweight row serializer for ApplicationsListView.
+    Expects a `certificates_count` annotation and `is_admin` in the context.
+    """
+    ariza_raqami = serializers.IntegerField(source='id')
+    xizmat_nomi = serializers.CharField(source='reward.name')
+    yuborilgan_kuni = serializers.SerializerMethodField()
+    holati = serializers.CharField(source='get_status_display')
+    holati_code = serializers.CharField(source='status')
+    manba = serializers.CharField(source='source', allow_null=True)
+
+    # Additional info (only for admins)
+    foydalanuvchi = serializers.SerializerMethodField()
+    pinfl = serializers.SerializerMethodField()
+    telefon = serializers.SerializerMethodField()
+    hudud = serializers.SerializerMethodField()
+
+    tavsiya_xati = serializers.SerializerMethodField()
+    sertifikatlar_soni = serializers.IntegerField(source='certificates_count')
+
+    yaratilgan_vaqt = serializers.SerializerMethodField()
+    yangilangan_vaqt = serializers.SerializerMethodField()
+
+    # Columns actually read by this serializer, for queryset.only()
+    ONLY_FIELDS = [
+        'id', 'status', 'submission_status', 'area', 'source', 'recommendation_letter', 'created_at', 'updated_at',
+        'reward__name', 'user__first_name', 'user__last_name', 'user__pinfl', 'user__phone_number',
+    ]
+
+    class Meta:
+        model = Application
+        fields = [
+            'ariza_raqami', 'xizmat_nomi', 'yuborilgan_kuni', 'holati', 'holati_code', 'manba',
+            'foydalanuvchi', 'pinfl', 'telefon', 'hudud',
+            'tavsiya_xati', 'sertifikatlar_soni',
+            'yaratilgan_vaqt', 'yangilangan_vaqt',
+        ]
+
+    def _is_admin(self):
+        return self.context.get('is_admin', False)
+
+    def get_yuborilgan_kuni(self, obj):
+        return obj.created_at.strftime('%d.%m.%Y')
+
+    def get_foydalanuvchi(self, obj):
+        return f"{obj.user.first_name} {obj.user.last_name}" if self._is_admin() else None
+
+    def get_pinfl(self, obj):
+        return obj.user.pinfl if self._is_admin() else None
+
+    def get_telefon(self, obj):
+        return obj.user.phone_number if self._is_admin() else None
+
+    def get_hudud(self, obj):
+        return obj.get_area_display() if self._is_admin() else None
+
+    def get_tavsiya_xati(self, obj):
+        return 'Mavjud' if obj.recommendation_letter else 'Mavjud emas'
+
+    def get_yaratilgan_vaqt(self, obj):
+        return obj.created_at.strftime('%d.%m.%Y %H:%M')
+
+    def get_yangilangan_vaqt(self, obj):
+        return obj.updated_at.strftime('%d.%m.%Y %H:%M')
+
+
 class ApplicationStep3Serializer(serializers.Serializer):
     """
     Step 3: Documents Upload (Yutuqlarni tasdiqlash)
@@ -253,6 +333,14 @@ class ApplicationStep3Serializer(serializers.Serializer):
         allow_empty=True
     )
 
+    # Files sent beforehand through the chunked upload API
+    recommendation_letter_upload_id = serializers.UUIDField(required=False, allow_null=True)
+    certificate_upload_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        allow_empty=True
+    )
+
     def validate_recommendation_letter(self, value):
         """Validate recommendation letter"""
         if value:
@@ -290,6 +378,88 @@ class ApplicationStep3Serializer(serializers.Serializer):
 
         return value
 
+    def validate(self, attrs):
+        """
+        Resolve chunked upload ids to the user's completed uploads. They are
+        locked, so validate inside the transaction that calls attach_uploads().
+        """
+        user = self.context['request'].user
+        # The same upload listed twice is one certificate
+        attrs['certificate_upload_ids'] = list(dict.fromkeys(attrs.get('certificate_upload_ids') or []))
+        upload_ids = list(attrs['certificate_upload_ids'])
+        if attrs.get('recommendation_letter_upload_id'):
+            if attrs['recommendation_letter_upload_id'] in upload_ids:
+                raise serializers.ValidationError({
+                    'uploads': "Bitta fayl ham tavsiya xati, ham sertifikat sifatida yuborilgan"
+                })
+            upload_ids.append(attrs['recommendation_letter_upload_id'])
+
+        uploads = ChunkedUpload.objects.select_for_update().filter(
+            id__in=upload_ids, user=user, status='completed'
+        ).in_bulk()
+        missing = [str(upload_id) for upload_id in upload_ids if upload_id not in uploads]
+        if missing:
+            raise serializers.ValidationError({
+                'uploads': f"Yuklangan fayllar topilmadi yoki yakunlanmagan: {', '.join(missing)}"
+            })
+
+        certificate_uploads = [uploads[upload_id] for upload_id in attrs.get('certificate_upload_ids') or []]
+        if len(attrs.get('certificates') or []) + len(certificate_uploads) > 10:
+            raise serializers.ValidationError({'certificates': "Maksimal 10 ta sertifikat yuklash mumkin"})
+
+        attrs['certificate_uploads'] = certificate_uploads
+        attrs['recommendation_letter_upload'] = uploads.get(attrs.get('recommendation_letter_upload_id'))
+        return attrs
+
+    def attach_uploads(self):
+        """Chunked uploads now belong to the draft and can't be attached again"""
+        uploads = list(self.validated_data['certificate_uploads'])
+        if self.validated_data['recommendation_letter_upload'] and not self.validated_data.get('recommendation_letter'):
+            uploads.append(self.validated_data['recommendation_letter_upload'])
+        if uploads:
+            ChunkedUpload.objects.filter(pk__in=[upload.pk for upload in uploads]).update(status='attached')
+
+
+class ChunkedUploadStartSerializer(serializers.Serializer):
+    """Start a chunked upload: original file name and total size in bytes"""
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+    def validate_filename(self, value):
+        if not any(value.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS):
+            raise serializers.ValidationError(
+                f"Faqat {', '.join(ALLOWED_EXTENSIONS)} formatdagi fayllar qabul qilinadi"
+            )
+        return value
+
+    def validate_size(self, value):
+        if value > MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError("Fayl hajmi 10MB dan oshmasligi kerak")
+        return value
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    upload_id = serializers.UUIDField(source='id', read_only=True)
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ['upload_id', 'filename', 'total_size', 'offset', 'status', 'created_at']
+        read_only_fields = fields
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    """Applications to move to one target status"""
+    status = serializers.ChoiceField(choices=Application.STATUS_CHOICES)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.APPLICATIONS_BULK_TRANSITION_MAX_IDS
+    )
+
+
+class BulkTransitionRequestSerializer(serializers.Serializer):
+    transitions = BulkTransitionSerializer(many=True, allow_empty=False)
+
 
 class ApplicationFinalSerializer(serializers.Serializer):
     """
@@ -341,23 +511,13 @@ class ApplicationFinalSerializer(serializers.Serializer):
         recommendation_letter_data = validated_data.pop('recommendation_letter', None)
         reward_id = validated_data.pop('reward_id')
 
-        # Handle recommendation letter file
-        recommendation_letter_file = None
-        if recommendation_letter_data and recommendation_letter_data.get('file_path'):
-            from django.core.files.storage import default_storage
-            from django.core.files.base import ContentFile
-
-            try:
-                # Read file from temporary storage
-                file_content = default_storage.open(recommendation_letter_data['file_path']).read()
-                recommendation_letter_file = ContentFile(
-                    file_content,
-                    name=recommendation_letter_data['original_name']
-                )
-            except Exception as e:
-                print(f"Error reading recommendation letter: {e}")
+        # With context['async'] the row is only reserved here; files and the
+        # created notification are handled by finalize_application_task
+        is_async = self.context.get('async', False)
+
+        # A failed asynchronous submission only reserved the row; this one replaces it
+        Application.objects.filter(user=user, reward_id=reward_id, submission_status='failed').delete()
 
-        # Create application
         application = Application.objects.create(
             user=user,
             reward_id=reward_id,
@@ -366,52 +526,24 @@ class ApplicationFinalSerializer(serializers.Serializer):
             neighborhood=validated_data['neighborhood'],
             activity=validated_data['activity'],
             activity_description=validated_data['activity_description'],
-            recommendation_letter=recommendation_letter_file,
             source=validated_data.get('source', 'web'),
-            status='yuborilgan'
+            status='yuborilgan',
+            submission_status='processing' if is_async else 'completed'
         )
 
-        # Create certificates from file metadata
-        for cert_data in certificates_data:
-            if cert_data.get('file_path'):
-                try:
-                    # Read file from temporary storage
-                    file_content = default_storage.open(cert_data['file_path']).read()
-                    certificate_file = ContentFile(
-                        file_content,
-                        name=cert_data['original_name']
-                    )
-
-                    Certificates.objects.create(
-                        application=application,
-                        file=certificate_file
-                    )
-                except Exception as e:
-                    print(f"Error reading certificate {cert_data['original_name']}: {e}")
-
-        # Clean up temporary files after successful creation
-        self._cleanup_temp_files(certificates_data, recommendation_letter_data)
+        if is_async:
+            draft_key = self.context.get('draft_key')
+            transaction.on_commit(lambda: enqueue_submission(
+                application.pk, recommendation_letter_data, certificates_data, draft_key
+            ))
+        elif self.context.get('staging') is not None:
+            # The caller's FileStaging wraps its whole transaction, see ApplicationFinalReviewView.post
+            stage_submission_files(self.context['staging'], application, recommendation_letter_data, certificates_data)
+        else:
+            attach_submission_files(application, recommendation_letter_data, certificates_data)
 
         return application
 
-    def _cleanup_temp_files(self, certificates_data, recommendation_letter_data):
-        """Clean up temporary files"""
-        from django.core.files.storage import default_storage
-
-        # Clean up recommendation letter
-        if recommendation_letter_data and recommendation_letter_data.get('file_path'):
-            try:
-                default_storage.delete(recommendation_letter_data['file_path'])
-            except Exception as e:
-                print(f"Error deleting temp file: {e}")
-
-        # Clean up certificates
-        for cert_data in certificates_data:
-            if cert_data.get('file_path'):
-                try:
-                    default_storage.delete(cert_data['file_path'])
-                except Exception as e:
-                    print(f"Error deleting temp file: {e}")
 
 class ApplicationDetailSerializer(serializers.ModelSerializer):
     """Serializer for displaying complete application details"""
@@ -432,7 +564,7 @@ class ApplicationDetailSerializer(serializers.ModelSerializer):
             'reward_name', 'reward_image', 'status', 'status_display',
             'area', 'area_display', 'district', 'neighborhood',
             'activity', 'activity_description', 'recommendation_letter',
-            'certificates', 'source', 'created_at', 'updated_at'
+            'certificates', 'source', 'submission_status', 'created_at', 'updated_at'
         ]
 
     def get_recommendation_letter(self, obj):
@@ -476,3 +608,25 @@ class ApplicationSessionSerializer(serializers.Serializer):
         if value not in [1, 2, 3, 4]:
             raise serializers.ValidationError("Noto'g'ri qadam raqami")
         return value
+
+
+class StatsQuerySerializer(serializers.Serializer):
+    """Query params for statistics endpoints: date range and histogram bucket size"""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    bucket = serializers.ChoiceField(choices=['day', 'week', 'month'], default='month')
+
+    MAX_BUCKETS = 366
+    BUCKET_DAYS = {'day': 1, 'week': 7, 'month': 28}
+
+    def validate(self, attrs):
+        from django.utils import timezone
+
+        date_from = attrs.get('date_from')
+        date_to = attrs.get('date_to') or timezone.localdate()
+        if date_from:
+            if date_from > date_to:
+                raise serializers.ValidationError("date_from date_to dan keyin bo'lishi mumkin emas")
+            if (date_to - date_from).days // self.BUCKET_DAYS[attrs['bucket']] > self.MAX_BUCKETS:
+                raise serializers.ValidationError("Tanlangan oraliq juda katta")
+        return attrs
@@ -0,0 +1,91 @@
+import logging
+
+from django.db import transaction
+
+from .drafts import DraftStore, release_draft_files
+from .models import Application, Certificates
+from .storage import FileStaging
+
+logger = logging.getLogger(__name__)
+
+
+def attach_submission_files(application, recommendation_letter_data, certificates_data):
+    """
+    Move the temp files of a submission into place and create its Certificates
+    rows in one transaction; on failure the files go back to temp storage.
+    """
+    with FileStaging() as staging, transaction.atomic():
+        stage_submission_files(staging, application, recommendation_letter_data, certificates_data)
+
+
+def stage_submission_files(staging, application, recommendation_letter_data, certificates_data):
+    """Promote all files first, then write the rows: at most one UPDATE and one INSERT"""
+    if recommendation_letter_data and recommendation_letter_data.get('file_path'):
+        application.recommendation_letter = staging.promote(
+            recommendation_letter_data['file_path'],
+            Application._meta.get_field('recommendation_letter'),
+            recommendation_letter_data['original_name']
+        )
+
+    certificate_field = Certificates._meta.get_field('file')
+    certificates = [
+        Certificates(
+            application=application,
+            file=staging.promote(cert_data['file_path'], certificate_field, cert_data['original_name'])
+        )
+        for cert_data in certificates_data or []
+        if cert_data.get('file_path')
+    ]
+
+    if application.recommendation_letter:
+        application.save(update_fields=['recommendation_letter', 'updated_at'])
+    Certificates.objects.bulk_create(certificates)
+
+
+def enqueue_submission(application_id, recommendation_letter_data, certificates_data, draft_key=None):
+    """Hand an asynchronous submission to finalize_application_task; marks it failed if the broker is unreachable"""
+    from .tasks import finalize_application_task
+
+    try:
+        finalize_application_task.delay(application_id, recommendation_letter_data, certificates_data, draft_key)
+    except Exception as exc:
+        logger.warning(f"Could not enqueue submission of application {application_id}: {exc!r}")
+        mark_submission_failed(application_id, exc)
+
+
+def finalize_submission(application_id, recommendation_letter_data, certificates_data, draft_key=None):
+    """
+    Second half of an asynchronous submission: attach files, send the
+    "application created" notification, mark the submission completed and
+    drop the draft it came from. Does nothing if the application is no longer
+    processing.
+    """
+    from notifications.services import NotificationService
+
+    with FileStaging() as staging, transaction.atomic():
+        application = Application.objects.select_for_update().select_related('user', 'reward').filter(
+            pk=application_id, submission_status='processing'
+        ).first()
+        if application is None:
+            return None
+
+        stage_submission_files(staging, application, recommendation_letter_data, certificates_data)
+
+        application.submission_status = 'completed'
+        application.submission_error = ''
+        application.save(update_fields=['submission_status', 'submission_error', 'updated_at'])
+
+        NotificationService.create_application_created_notification(application)
+
+        if draft_key:
+            release_draft_files(draft_key)
+            transaction.on_commit(lambda: DraftStore().delete(draft_key))
+    return application
+
+
+def mark_submission_failed(application_id, error):
+    """The row stays for the status URL; submitting the draft again replaces it"""
+    Application.objects.filter(pk=application_id, submission_status='processing').update(
+        submission_status='failed',
+        submission_error=str(error)
+    )
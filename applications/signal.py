@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Application, Reward, RewardStats
+from .search import index_applications
+
+CustomUser = get_user_model()
+
+# Fields that end up in the application search document
+USER_SEARCH_FIELDS = {'first_name', 'last_name', 'pinfl'}
+
+
+@receiver(post_save, sender=Reward)
+def create_reward_stats(sender, instance, created, **kwargs):
+    """Every reward gets its counters row up front"""
+    if created:
+        RewardStats.objects.get_or_create(reward=instance)
+
+
+@receiver(post_save, sender=Application)
+def index_application(sender, instance, created, **kwargs):
+    """Keep the search document in sync; only new applications and a changed user or reward touch it"""
+    # Application.save updates the _original_* values after post_save
+    unchanged = instance._original_user_id == instance.user_id and instance._original_reward_id == instance.reward_id
+    if not created and unchanged:
+        return
+    index_applications(Application.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=CustomUser)
+def reindex_user_applications(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and not USER_SEARCH_FIELDS & set(update_fields)):
+        return
+    index_applications(Application.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=Reward)
+def reindex_reward_applications(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and 'name' not in update_fields):
+        return
+    index_applications(Application.objects.filter(reward=instance))
+
+
+@receiver(post_delete, sender=Application)
+def update_reward_stats_on_delete(sender, instance, **kwargs):
+    """Also fires for queryset and cascade deletes, which bypass Application.delete"""
+    if (instance._original_submission_status or instance.submission_status) != 'completed':
+        return
+    status = instance._original_status or instance.status
+    reward_id = instance._original_reward_id or instance.reward_id
+    RewardStats.apply_delta(reward_id, {status: -1})
@@ -0,0 +1,134 @@
+from datetime import datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Application
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+DEFAULT_BUCKET = 'month'
+
+
+def status_breakdown(queryset):
+    """
+    Count applications per status in a single query.
+
+    Returns {status_code: {'name': ..., 'count': ...}} with every status present,
+    including the ones that have no applications.
+    """
+    counts = queryset.aggregate(**{
+        status_code: Count('id', filter=Q(status=status_code))
+        for status_code, _ in Application.STATUS_CHOICES
+    })
+    return {
+        status_code: {
+            'name': status_name,
+            'count': counts[status_code]
+        }
+        for status_code, status_name in Application.STATUS_CHOICES
+    }
+
+
+def default_range(bucket=DEFAULT_BUCKET, end_date=None):
+    """Last 12 months (or 30 days / 12 weeks for smaller buckets), ending today by default"""
+    end_date = end_date or timezone.localdate()
+    if bucket == 'day':
+        start_date = end_date - timedelta(days=30)
+    elif bucket == 'week':
+        start_date = end_date - timedelta(weeks=12)
+    else:
+        start_date = end_date - relativedelta(months=12)
+    return start_date, end_date
+
+
+def _bucket_start(value, bucket):
+    if bucket == 'month':
+        return value.replace(day=1)
+    if bucket == 'week':
+        return value - timedelta(days=value.weekday())
+    return value
+
+
+def _bucket_step(bucket):
+    if bucket == 'month':
+        return relativedelta(months=1)
+    if bucket == 'week':
+        return timedelta(weeks=1)
+    return timedelta(days=1)
+
+
+def _bucket_label(value, bucket):
+    if bucket == 'month':
+        return value.strftime('%Y-%m')
+    return value.isoformat()
+
+
+def histogram(queryset, start_date=None, end_date=None, bucket=DEFAULT_BUCKET):
+    """
+    Count applications per day/week/month between start_date and end_date
+    (inclusive, local dates) with one grouped query.
+
+    Buckets without applications are filled with zero in Python, so the result
+    is a continuous series: [{'period': '2025-09', 'count': 3}, ...]
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+
+    if start_date is None or end_date is None:
+        default_start, default_end = default_range(bucket, end_date)
+        start_date = start_date or default_start
+        end_date = end_date or default_end
+
+    first_bucket = _bucket_start(start_date, bucket)
+    tz = timezone.get_current_timezone()
+    range_start = timezone.make_aware(datetime.combine(first_bucket, time.min), tz)
+    range_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+
+    rows = (
+        queryset
+        .filter(created_at__gte=range_start, created_at__lt=range_end)
+        .annotate(period=BUCKETS[bucket]('created_at', tzinfo=tz))
+        .values('period')
+        .annotate(count=Count('id'))
+        .order_by('period')
+    )
+    counts = {}
+    for row in rows:
+        period = row['period']
+        if isinstance(period, datetime):
+            period = timezone.localtime(period, tz).date()
+        counts[period] = row['count']
+
+    series = []
+    current = first_bucket
+    step = _bucket_step(bucket)
+    while current <= end_date:
+        series.append({
+            'period': _bucket_label(current, bucket),
+            'count': counts.get(current, 0)
+        })
+        current = current + step
+
+    return series
+
+
+def application_stats(queryset, start_date=None, end_date=None, bucket=DEFAULT_BUCKET):
+    """Status breakdown and histogram for a queryset: two queries in total"""
+    breakdown = status_breakdown(queryset)
+    series = histogram(queryset, start_date, end_date, bucket)
+
+    return {
+        'total_applications': sum(item['count'] for item in breakdown.values()),
+        'status_breakdown': breakdown,
+        'histogram': {
+            'bucket': bucket,
+            'series': series,
+        },
+    }
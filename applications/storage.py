@@ -0,0 +1,108 @@
+import os
+import posixpath
+
+from .uploads import TEMP_UPLOAD_DIR
+
+
+class PromoteError(Exception):
+    pass
+
+
+def is_temp_path(path):
+    """Only files under temp_uploads/ may be promoted"""
+    normalized = posixpath.normpath(path or '')
+    return normalized.startswith(f"{TEMP_UPLOAD_DIR}/") and '..' not in normalized.split('/')
+
+
+def promote(temp_path, field, original_name, instance=None):
+    """
+    Move a temp upload into `field`'s upload_to directory and return the new
+    file name, ready to assign to the field.
+
+    Local storage renames the file with os.replace, so the content is never
+    read into Python; any other storage gets a chunked copy through its public
+    open/save/delete API.
+    """
+    if not is_temp_path(temp_path):
+        raise PromoteError(f"Vaqtinchalik fayl emas: {temp_path}")
+
+    storage = field.storage
+    if not storage.exists(temp_path):
+        raise PromoteError(f"Vaqtinchalik fayl topilmadi: {temp_path}")
+
+    name = field.generate_filename(instance, original_name)
+    name = storage.get_available_name(name, max_length=field.max_length)
+    return _move(storage, temp_path, name, field.max_length)
+
+
+def demote(name, temp_path, field):
+    """Undo promote(): move a promoted file back to its temp path"""
+    storage = field.storage
+    if storage.exists(name):
+        _move(storage, name, temp_path)
+
+
+class FileStaging:
+    """
+    Files written to their final location ahead of the rows that reference them.
+
+    Use as the outermost context around the transaction that creates the rows:
+
+        with FileStaging() as staging, transaction.atomic():
+            Certificates.objects.bulk_create([...staging.save(field, f)...])
+
+    If anything in the block fails, saved files are deleted and promoted
+    files are moved back to temp storage, so no media is left orphaned and
+    a retry can promote them again.
+    """
+
+    def __init__(self):
+        self.saved = []
+        self.promoted = []
+
+    def save(self, field, uploaded_file, instance=None):
+        """Write an uploaded file into field's upload_to; returns its name"""
+        name = field.generate_filename(instance, uploaded_file.name)
+        name = field.storage.save(name, uploaded_file, max_length=field.max_length)
+        self.saved.append((field, name))
+        return name
+
+    def promote(self, temp_path, field, original_name, instance=None):
+        name = promote(temp_path, field, original_name, instance)
+        self.promoted.append((field, name, temp_path))
+        return name
+
+    def rollback(self):
+        for field, name in self.saved:
+            field.storage.delete(name)
+        for field, name, temp_path in self.promoted:
+            demote(name, temp_path, field)
+        self.saved, self.promoted = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rollback()
+        return False
+
+
+def _move(storage, source, destination, max_length=None):
+    if _has_local_path(storage):
+        full_path = storage.path(destination)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(storage.path(source), full_path)
+    else:
+        with storage.open(source, 'rb') as content:
+            destination = storage.save(destination, content, max_length=max_length)
+        storage.delete(source)
+    return destination
+
+
+def _has_local_path(storage):
+    try:
+        storage.path('')
+    except NotImplementedError:
+        return False
+    return True
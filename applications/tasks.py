@@ -0,0 +1,56 @@
+import logging
+import time
+
+from celery import shared_task
+
+from config.cache import count_cache
+
+from .drafts import sweep_temp_uploads
+from .pagination import listing_queryset
+from .services import finalize_submission, mark_submission_failed
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_count_task(cache_key):
+    """Recount a cached listing total (see applications.pagination.get_total_count)"""
+    entry = count_cache.get(cache_key)
+    if entry is None:
+        return None
+
+    queryset = listing_queryset(entry['listing'])
+    if queryset is None:
+        count_cache.delete_many([cache_key, f"{cache_key}_refreshing"])
+        return None
+
+    entry['count'] = queryset.count()
+    entry['refreshed_at'] = time.time()
+    count_cache.set(cache_key, entry)
+    count_cache.delete(f"{cache_key}_refreshing")
+
+    logger.info(f"Refreshed listing count {cache_key}: {entry['count']}")
+    return entry['count']
+
+
+@shared_task(bind=True, max_retries=3)
+def finalize_application_task(self, application_id, recommendation_letter_data, certificates_data, draft_key=None):
+    """Finish an asynchronous submission (see ApplicationFinalSerializer.create)"""
+    try:
+        application = finalize_submission(application_id, recommendation_letter_data, certificates_data, draft_key)
+    except Exception as exc:
+        logger.error(f"Failed to finalize application {application_id}: {exc}")
+        if self.request.retries >= self.max_retries:
+            mark_submission_failed(application_id, exc)
+            raise
+        raise self.retry(exc=exc, countdown=5 * 2 ** self.request.retries)
+
+    if application is not None:
+        logger.info(f"Application {application_id} finalized")
+    return application_id
+
+
+@shared_task
+def sweep_temp_uploads_task():
+    """Periodic cleanup of abandoned temp uploads (CELERY_BEAT_SCHEDULE)"""
+    return sweep_temp_uploads()
@@ -1,3 +1,1004 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from config.cache import count_cache, draft_cache, lock_cache
+
+from .models import Application, Certificates, ChunkedUpload, DraftFile, Reward, RewardStats
+from .drafts import DraftStore, register_draft_files, sweep_temp_uploads
+from .serializers import ApplicationCreateSerializer, ApplicationFinalSerializer
+from .search import search_applications
+from .services import attach_submission_files
+from .storage import PromoteError, promote
+from .tasks import finalize_application_task, refresh_count_task
+from . import transitions
+from .transitions import TransitionError, bulk_transition, on_enter, transition
+from .uploads import ChunkError, write_chunk
+from .views import ApplicationsListView
+
+CustomUser = get_user_model()
+
+
+class ApplicationTestMixin:
+    """Shared fixtures for application API tests"""
+
+    def create_user(self, index, **extra_fields):
+        fields = {
+            'first_name': f'Ism{index}',
+            'last_name': f'Familiya{index}',
+            'pinfl': f'{index:014d}',
+        }
+        fields.update(extra_fields)
+        return CustomUser.objects.create_user(
+            email=f'user{index}@example.com',
+            phone_number=f'+99890000{index:04d}',
+            **fields
+        )
+
+    def create_reward(self, name='Mukofot'):
+        return Reward.objects.create(name=name, description='Tavsif', image='rewards/test.png')
+
+    def create_application(self, user, reward, **extra_fields):
+        fields = {
+            'area': 'Toshkent',
+            'district': 'Chilonzor',
+            'neighborhood': 'Mahalla',
+            'activity': 'Faoliyat',
+            'activity_description': 'Tavsif',
+        }
+        fields.update(extra_fields)
+        return Application.objects.create(user=user, reward=reward, **fields)
+
+    def set_created_at(self, application, year, month, day=15):
+        created_at = timezone.make_aware(datetime(year, month, day, 12))
+        Application.objects.filter(pk=application.pk).update(created_at=created_at)
+
+
+class RewardStatsTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.admin = self.create_user(0, is_staff=True)
+        self.reward = self.create_reward()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('applications:reward-stats', args=[self.reward.pk])
+
+    def create_applications(self, count):
+        start = CustomUser.objects.count()
+        for index in range(start, start + count):
+            application = self.create_application(self.create_user(index), self.reward)
+            self.set_created_at(application, 2025, (index % 12) + 1)
+
+    def test_stats_query_count_does_not_depend_on_data(self):
+        self.create_applications(3)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'date_from': '2025-01-01', 'date_to': '2025-12-31'})
+        self.assertEqual(response.status_code, 200)
+
+        self.create_applications(12)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'date_from': '2025-01-01', 'date_to': '2025-12-31'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_monthly_histogram_fills_empty_months(self):
+        first = self.create_application(self.create_user(1), self.reward)
+        second = self.create_application(self.create_user(2), self.reward, status='mahalla')
+        self.set_created_at(first, 2025, 3)
+        self.set_created_at(second, 2025, 5)
+
+        response = self.client.get(self.url, {'date_from': '2025-02-10', 'date_to': '2025-06-01'})
+        statistics = response.data['statistics']
+
+        self.assertEqual(statistics['total_applications'], 2)
+        self.assertEqual(statistics['status_breakdown']['mahalla']['count'], 1)
+        self.assertEqual(statistics['status_breakdown']['rad_etilgan']['count'], 0)
+        self.assertEqual(statistics['monthly_applications'], [
+            {'month': '2025-02', 'count': 0},
+            {'month': '2025-03', 'count': 1},
+            {'month': '2025-04', 'count': 0},
+            {'month': '2025-05', 'count': 1},
+            {'month': '2025-06', 'count': 0},
+        ])
+
+    def test_weekly_bucket(self):
+        application = self.create_application(self.create_user(1), self.reward)
+        self.set_created_at(application, 2025, 9, 10)
+
+        response = self.client.get(self.url, {
+            'date_from': '2025-09-01', 'date_to': '2025-09-14', 'bucket': 'week'
+        })
+        self.assertEqual(response.data['statistics']['histogram']['series'], [
+            {'period': '2025-09-01', 'count': 0},
+            {'period': '2025-09-08', 'count': 1},
+        ])
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get(self.url, {'date_from': '2025-09-01', 'date_to': '2025-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_dashboard_stats_share_the_engine(self):
+        self.create_applications(3)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('applications:application-stats'), {'bucket': 'day'})
+        self.assertEqual(response.data['stats']['umumiy_arizalar'], 3)
+        self.assertEqual(response.data['stats']['holat_boyicha']['yuborilgan'], 3)
+        self.assertEqual(response.data['stats']['histogram']['bucket'], 'day')
+
+
+class RewardStatsCounterTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.reward = self.create_reward()
+        self.other_reward = self.create_reward('Boshqa mukofot')
+
+    def assertCounters(self, reward, **expected):
+        stats = RewardStats.objects.get(reward=reward)
+        for field, value in expected.items():
+            self.assertEqual(getattr(stats, field), value, field)
+
+    def test_counters_follow_create_transition_and_delete(self):
+        first = self.create_application(self.create_user(1), self.reward)
+        second = self.create_application(self.create_user(2), self.reward)
+        self.assertCounters(self.reward, total=2, yuborilgan=2)
+
+        first.status = 'mukofotlangan'
+        first.save()
+        self.assertCounters(self.reward, total=2, yuborilgan=1, mukofotlangan=1)
+
+        second.reward = self.other_reward
+        second.save()
+        self.assertCounters(self.reward, total=1, yuborilgan=0)
+        self.assertCounters(self.other_reward, total=1, yuborilgan=1)
+
+        Application.objects.filter(pk=first.pk).delete()
+        self.assertCounters(self.reward, total=0, mukofotlangan=0)
+
+    def test_rebuild_matches_incremental_counters(self):
+        application = self.create_application(self.create_user(1), self.reward, status='tuman')
+        Application.objects.filter(pk=application.pk).update(status='hudud')
+        RewardStats.objects.filter(reward=self.reward).update(total=0, tuman=0)
+
+        call_command('rebuild_reward_stats', stdout=StringIO())
+        self.assertCounters(self.reward, total=1, tuman=0, hudud=1)
+
+    def test_reward_list_reads_counters(self):
+        self.create_application(self.create_user(1), self.reward)
+        client = APIClient()
+        client.force_authenticate(self.create_user(2))
+
+        with self.assertNumQueries(1):
+            response = client.get(reverse('applications:reward-list'))
+        counts = {item['id']: item['applications_count'] for item in response.data['rewards']}
+        self.assertEqual(counts, {self.reward.pk: 1, self.other_reward.pk: 0})
+
+
+class ApplicationsListViewTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.admin = self.create_user(0, is_staff=True)
+        self.reward = self.create_reward()
+        for index in range(1, 13):
+            application = self.create_application(self.create_user(index), self.reward)
+            Certificates.objects.create(application=application, file='certificates/a.pdf')
+            Certificates.objects.create(application=application, file='certificates/b.pdf')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('applications:application-list')
+        count_cache.clear()
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for page_size in (2, 5, 10):
+            with self.assertNumQueries(2):
+                response = self.client.get(self.url, {'page_size': page_size})
+            self.assertEqual(len(response.data['data']), page_size)
+
+    def test_rows(self):
+        response = self.client.get(self.url, {'page_size': 1})
+        row = response.data['data'][0]
+
+        self.assertEqual(row['sertifikatlar_soni'], 2)
+        self.assertEqual(row['holati_code'], 'yuborilgan')
+        self.assertEqual(row['tavsiya_xati'], 'Mavjud emas')
+        self.assertEqual(row['foydalanuvchi'], 'Ism12 Familiya12')
+        self.assertEqual(response.data['pagination']['total_count'], 12)
+
+    def test_regular_user_does_not_see_personal_fields(self):
+        user = CustomUser.objects.get(email='user1@example.com')
+        self.client.force_authenticate(user)
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertIsNone(response.data['data'][0]['pinfl'])
+
+    def test_cursor_mode_walks_all_pages(self):
+        seen = []
+        cursor = ''
+        while True:
+            response = self.client.get(self.url, {'cursor': cursor, 'page_size': 5, 'with_total': 'false'})
+            pagination = response.data['pagination']
+            self.assertIsNone(pagination['total_count'])
+            seen.extend(row['ariza_raqami'] for row in response.data['data'])
+            if not pagination['has_next']:
+                break
+            cursor = pagination['next_cursor']
+
+        self.assertEqual(seen, list(Application.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_cursor_mode_without_total_skips_count(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'cursor': '', 'with_total': 'false'})
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_generic_listing_cursor_mode(self):
+        url = reverse('applications:reward-applications', args=[self.reward.pk])
+
+        response = self.client.get(url, {'cursor': '', 'page_size': 10})
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 10)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    def test_generic_listing_page_mode(self):
+        url = reverse('applications:reward-applications', args=[self.reward.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    @override_settings(APPLICATIONS_MAX_PAGE_SIZE=5)
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.url, {'page_size': 100000})
+        self.assertEqual(len(response.data['data']), 5)
+        self.assertEqual(response.data['pagination']['page_size'], 5)
+        self.assertEqual(response.data['pagination']['total_pages'], 3)
+
+    @override_settings(APPLICATIONS_APPROXIMATE_COUNT_THRESHOLD=10)
+    def test_large_totals_are_served_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['pagination']['total_count'], 12)
+        self.assertFalse(response.data['pagination']['count_is_approximate'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['pagination']['total_count'], 12)
+        self.assertTrue(response.data['pagination']['count_is_approximate'])
+
+        # Below the threshold the count stays exact
+        response = self.client.get(self.url, {'status': 'mahalla'})
+        self.assertEqual(response.data['pagination']['total_count'], 0)
+        self.assertFalse(response.data['pagination']['count_is_approximate'])
+
+    @override_settings(APPLICATIONS_APPROXIMATE_COUNT_THRESHOLD=5, APPLICATIONS_COUNT_REFRESH_INTERVAL=-1)
+    def test_stale_totals_are_recounted_from_the_listing_description(self):
+        url = reverse('applications:reward-applications', args=[self.reward.pk])
+        self.client.get(url, {'status': 'yuborilgan', 'page': 2})
+        self.create_application(self.create_user(13), self.reward)
+
+        with mock.patch.object(refresh_count_task, 'delay') as delay:
+            response = self.client.get(url, {'status': 'yuborilgan', 'page_size': 5})
+        self.assertEqual(response.data['count'], 12)
+        self.assertTrue(response.data['count_is_approximate'])
+
+        cache_key, = delay.call_args.args
+        self.assertEqual(count_cache.get(cache_key)['listing']['params'], {'status': ['yuborilgan']})
+        self.assertEqual(refresh_count_task(cache_key), 13)
+        with mock.patch.object(refresh_count_task, 'delay'):
+            self.assertEqual(self.client.get(url, {'status': 'yuborilgan'}).data['count'], 13)
+
+    @override_settings(APPLICATIONS_APPROXIMATE_COUNT_THRESHOLD=5, APPLICATIONS_COUNT_REFRESH_INTERVAL=-1)
+    def test_stale_total_is_served_when_the_broker_is_down(self):
+        self.client.get(self.url, {'search': 'Ism'})
+
+        broker_down = mock.patch.object(refresh_count_task, 'delay', side_effect=OperationalError('down'))
+        with broker_down, self.assertLogs('applications.pagination', 'WARNING'):
+            response = self.client.get(self.url, {'search': 'Ism'})
+        self.assertEqual(response.data['pagination']['total_count'], 12)
+        self.assertTrue(response.data['pagination']['count_is_approximate'])
+
+
+class ApplicationSearchTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.admin = self.create_user(0, is_staff=True)
+        self.reward = self.create_reward('Mehnat shuhrati')
+        self.other_reward = self.create_reward('Do\'stlik')
+        self.alisher = self.create_user(1, first_name='Alisher', last_name='Valiyev', pinfl='30101990123456')
+        self.vali = self.create_user(2, first_name='Vali', last_name='Alimov', pinfl='30101990654321')
+        self.create_application(self.alisher, self.reward)
+        self.create_application(self.vali, self.other_reward)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('applications:application-list')
+        count_cache.clear()
+
+    def search(self, term):
+        response = self.client.get(self.url, {'search': term})
+        return [row['foydalanuvchi'] for row in response.data['data']], response.data['filters']['search_mode']
+
+    def test_name_prefix_search(self):
+        self.assertEqual(self.search('alish'), (['Alisher Valiyev'], 'text'))
+
+    def test_reward_name_search(self):
+        self.assertEqual(self.search('mehnat'), (['Alisher Valiyev'], 'text'))
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('vali mehnat'), (['Alisher Valiyev'], 'text'))
+
+    def test_ranked_results(self):
+        # Two matching words rank above one, however old the application
+        best = self.create_user(3, first_name='Vali', last_name='Valiyev', pinfl='30101990111111')
+        self.set_created_at(self.create_application(best, self.other_reward), 2020, 1)
+
+        names, _ = self.search('vali')
+        self.assertEqual(names, ['Vali Valiyev', 'Vali Alimov', 'Alisher Valiyev'])
+
+    def test_pinfl_prefix_search(self):
+        self.assertEqual(self.search('301019906'), (['Vali Alimov'], 'pinfl'))
+        self.assertEqual(self.search('3010199'), (['Vali Alimov', 'Alisher Valiyev'], 'pinfl'))
+
+    def test_document_follows_user_and_reward_changes(self):
+        self.alisher.first_name = 'Bobur'
+        self.alisher.save()
+        self.reward.name = 'Shon-sharaf'
+        self.reward.save()
+
+        self.assertEqual(self.search('alisher'), ([], 'text'))
+        self.assertEqual(self.search('bobur sharaf'), (['Bobur Valiyev'], 'text'))
+
+    def test_deleted_application_leaves_the_index(self):
+        Application.objects.filter(user=self.alisher).delete()
+        self.assertEqual(self.search('alisher'), ([], 'text'))
+
+    def test_saves_that_keep_user_and_reward_do_not_reindex(self):
+        application = Application.objects.get(user=self.alisher)
+        application.district = 'Yunusobod'
+        with CaptureQueriesContext(connection) as queries:
+            application.save()
+        self.assertFalse([q for q in queries if 'applicationsearchdocument' in q['sql']])
+
+        application.reward = self.other_reward
+        application.save()
+        self.assertEqual(self.search('alisher'), (['Alisher Valiyev'], 'text'))
+        self.assertEqual(self.search('alisher mehnat'), ([], 'text'))
+
+    @skipUnless(connection.vendor == 'postgresql', "GIN index is PostgreSQL specific")
+    def test_postgres_search_uses_the_gin_index(self):
+        queryset, _ = search_applications(Application.objects.all(), 'alisher')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn('applications_search_document_gin', queryset.explain())
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class ApplicationQueryPlanTests(ApplicationTestMixin, TestCase):
+    """
+    Fails if one of the listing/stats queries regresses to a full table scan
+    or to a temporary sort for the '-created_at' ordering. Listings are
+    checked on the queryset ApplicationsListView actually runs.
+    """
+    table = Application._meta.db_table
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reward = Reward.objects.create(name='Mukofot', description='Tavsif', image='rewards/test.png')
+        cls.user = CustomUser.objects.create_user(email='plan@example.com', phone_number='+998900009999')
+        cls.admin = CustomUser.objects.create_user(
+            email='plan-admin@example.com', phone_number='+998900009998', is_staff=True
+        )
+
+    def listing(self, user, **params):
+        request = APIRequestFactory().get(reverse('applications:application-list'), params)
+        force_authenticate(request, user)
+        view = ApplicationsListView()
+        view.request = view.initialize_request(request)
+        return view.get_queryset()
+
+    def assertIndexed(self, queryset, index_name=None):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            if self.table not in line:
+                continue
+            self.assertFalse(
+                'SCAN' in line and 'INDEX' not in line,
+                f"Full scan of {self.table}:\n{plan}"
+            )
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, f"Sort not served by an index:\n{plan}")
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_listing(self):
+        self.assertIndexed(self.listing(self.admin), 'app_created_id_idx')
+
+    def test_status_listing(self):
+        self.assertIndexed(self.listing(self.admin, status='mahalla'), 'app_status_created_idx')
+
+    def test_reward_listing(self):
+        self.assertIndexed(self.listing(self.admin, reward_id=self.reward.pk), 'app_reward_created_idx')
+
+    def test_reward_status_listing(self):
+        self.assertIndexed(
+            self.listing(self.admin, reward_id=self.reward.pk, status='tuman'),
+            'app_reward_status_created_idx'
+        )
+
+    def test_user_listing(self):
+        self.assertIndexed(self.listing(self.user), 'app_user_created_idx')
+
+    def test_area_status_filter(self):
+        self.assertIndexed(
+            Application.objects.filter(area='Toshkent', status='hudud').order_by('-created_at'),
+            'app_area_status_created_idx'
+        )
+
+    def test_keyset_page(self):
+        self.assertIndexed(
+            Application.objects.order_by('-created_at', '-id')[:10],
+            'app_created_id_idx'
+        )
+
+
+class ChunkedUploadTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = self.create_user(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self, size):
+        response = self.client.post(
+            reverse('applications:chunked-upload-start'),
+            {'filename': 'tavsiya.pdf', 'size': size},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data['upload']['upload_id']
+
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.generic(
+            'PUT',
+            reverse('applications:chunked-upload', args=[upload_id]) + f'?offset={offset}',
+            data,
+            content_type='application/octet-stream'
+        )
+
+    def test_upload_resumes_from_server_offset(self):
+        upload_id = self.start(10)
+
+        self.assertEqual(self.put_chunk(upload_id, 0, b'01234').status_code, 200)
+
+        # Replaying an already stored chunk is rejected with the offset to resume from
+        response = self.put_chunk(upload_id, 0, b'01234')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 5)
+
+        self.assertEqual(self.put_chunk(upload_id, 5, b'56789').status_code, 200)
+        response = self.client.post(reverse('applications:chunked-upload-complete', args=[upload_id]))
+        self.assertEqual(response.status_code, 200)
+
+        upload = ChunkedUpload.objects.get(pk=upload_id)
+        self.assertEqual(upload.status, 'completed')
+        with open(f'{self.media_root}/{upload.file_path}', 'rb') as f:
+            self.assertEqual(f.read(), b'0123456789')
+
+    def test_incomplete_upload_cannot_be_completed(self):
+        upload_id = self.start(10)
+        self.put_chunk(upload_id, 0, b'012')
+
+        response = self.client.post(reverse('applications:chunked-upload-complete', args=[upload_id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 3)
+
+    def test_chunk_past_declared_size_is_rejected(self):
+        upload_id = self.start(4)
+        response = self.put_chunk(upload_id, 0, b'0123456')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(ChunkedUpload.objects.get(pk=upload_id).offset, 0)
+
+    def test_chunk_is_received_before_the_row_is_locked(self):
+        upload_id = self.start(10)
+        user = self.user
+
+        class RacedStream:
+            """Another request stores the same chunk while this one is still being received"""
+            def __init__(self):
+                self.raced = False
+
+            def read(self, size):
+                if not self.raced:
+                    self.raced = True
+                    write_chunk(upload_id, user, 0, BytesIO(b'abcde'), 5)
+                return b'01234'[:size]
+
+        with self.assertRaises(ChunkError) as error:
+            write_chunk(upload_id, self.user, 0, RacedStream(), 5)
+        self.assertEqual(error.exception.offset, 5)
+
+        upload = ChunkedUpload.objects.get(pk=upload_id)
+        with open(f'{self.media_root}/{upload.file_path}', 'rb') as f:
+            self.assertEqual(f.read(), b'abcde')
+
+    def test_step3_attaches_each_upload_once(self):
+        reward = self.create_reward()
+        DraftStore().update(f'application_draft_{self.user.pk}_{reward.pk}', {
+            'step1_data': {'reward_id': reward.pk}, 'step2_data': {'activity': 'Faoliyat'},
+        })
+        upload_id = self.start(3)
+        self.put_chunk(upload_id, 0, b'pdf')
+        self.client.post(reverse('applications:chunked-upload-complete', args=[upload_id]))
+
+        url = reverse('applications:application-step3') + f'?reward_id={reward.pk}'
+        response = self.client.post(url, {'certificate_upload_ids': [upload_id, upload_id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['certificates_count'], 1)
+        self.assertEqual(ChunkedUpload.objects.get(pk=upload_id).status, 'attached')
+
+        response = self.client.post(url, {'certificate_upload_ids': [upload_id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PromoteTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write_temp(self, name, content=b'data'):
+        path = f'temp_uploads/{name}'
+        os.makedirs(os.path.join(self.media_root, 'temp_uploads'), exist_ok=True)
+        with open(os.path.join(self.media_root, path), 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_promote_moves_file_into_upload_to(self):
+        temp_path = self.write_temp('a.pdf', b'sertifikat')
+        name = promote(temp_path, Certificates._meta.get_field('file'), 'diplom.pdf')
+
+        self.assertEqual(name, 'certificates/diplom.pdf')
+        self.assertFalse(default_storage.exists(temp_path))
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), b'sertifikat')
+
+    def test_promote_rejects_paths_outside_temp_dir(self):
+        with self.assertRaises(PromoteError):
+            promote('certificates/../../secret.pdf', Certificates._meta.get_field('file'), 'x.pdf')
+
+    def test_final_submission_promotes_temp_files(self):
+        user = self.create_user(0)
+        reward = self.create_reward()
+        letter_path = self.write_temp('letter.pdf', b'tavsiyanoma')
+        cert_path = self.write_temp('cert.pdf', b'sertifikat')
+
+        serializer = ApplicationFinalSerializer(data={
+            'first_name': 'Ali', 'last_name': 'Valiyev', 'pinfl': '12345678901234',
+            'phone_number': '+998900000000', 'area': 'Toshkent', 'district': 'Chilonzor',
+            'neighborhood': 'Mahalla', 'activity': 'Faoliyat', 'activity_description': 'Tavsif',
+            'reward_id': reward.pk,
+            'recommendation_letter': {'file_path': letter_path, 'original_name': 'letter.pdf'},
+            'certificates': [{'file_path': cert_path, 'original_name': 'cert.pdf'}],
+        }, context={'request': SimpleNamespace(user=user)})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        application = serializer.create(serializer.validated_data)
+
+        self.assertEqual(application.recommendation_letter.name, 'recommendation/letter.pdf')
+        self.assertEqual(application.certificates_set.get().file.name, 'certificates/cert.pdf')
+        self.assertFalse(default_storage.exists(letter_path))
+        self.assertFalse(default_storage.exists(cert_path))
+
+
+class AsyncSubmissionTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        draft_cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = self.create_user(0)
+        self.reward = self.create_reward()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        os.makedirs(os.path.join(self.media_root, 'temp_uploads'))
+        with open(os.path.join(self.media_root, 'temp_uploads', 'cert.pdf'), 'wb') as f:
+            f.write(b'sertifikat')
+        self.certificates = [{'file_path': 'temp_uploads/cert.pdf', 'original_name': 'cert.pdf'}]
+
+        self.draft_key = f'application_draft_{self.user.pk}_{self.reward.pk}'
+        DraftStore().update(self.draft_key, {
+            'step1_data': {
+                'first_name': 'Ali', 'last_name': 'Valiyev', 'pinfl': '12345678901234',
+                'phone_number': '+998900000000', 'area': 'Toshkent', 'district': 'Chilonzor',
+                'neighborhood': 'Mahalla', 'reward_id': self.reward.pk,
+            },
+            'step2_data': {'activity': 'Faoliyat', 'activity_description': 'Tavsif'},
+            'step3_data': {'recommendation_letter': None, 'certificates': self.certificates},
+        })
+
+    def submit_async(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse('applications:application-final') + f'?async=true&reward_id={self.reward.pk}'
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        return Application.objects.get(pk=response.data['application_id']), callbacks
+
+    def test_async_submission_is_finalized_by_task(self):
+        from notifications.models import Notification
+        from notifications.outbox import DRAIN_SCHEDULED_KEY
+
+        # Delivery is scheduled elsewhere; keep the notification outbox off the broker
+        lock_cache.set(DRAIN_SCHEDULED_KEY, True, 60)
+
+        application, _ = self.submit_async()
+        self.assertEqual(application.submission_status, 'processing')
+        self.assertFalse(Certificates.objects.filter(application=application).exists())
+        self.assertFalse(Notification.objects.filter(recipient=self.user).exists())
+
+        # Not listed or counted until the task has run; the draft is kept for a retry
+        response = self.client.get(reverse('applications:application-list'))
+        self.assertEqual(response.data['data'], [])
+        self.assertEqual(RewardStats.objects.get(reward=self.reward).total, 0)
+        self.assertIn('step3_data', DraftStore().get(self.draft_key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            finalize_application_task.apply(args=[application.pk, None, self.certificates, self.draft_key])
+
+        response = self.client.get(reverse('applications:application-submission-status', args=[application.pk]))
+        self.assertEqual(response.data['submission_status'], 'completed')
+        self.assertEqual(len(response.data['application']['certificates']), 1)
+        self.assertFalse(default_storage.exists('temp_uploads/cert.pdf'))
+        self.assertEqual(Notification.objects.filter(recipient=self.user).count(), 1)
+        self.assertEqual(RewardStats.objects.get(reward=self.reward).total, 1)
+        self.assertEqual(DraftStore().get(self.draft_key), {})
+
+        # A retried task does not finalize twice
+        finalize_application_task.apply(args=[application.pk, None, self.certificates, self.draft_key])
+        self.assertEqual(Notification.objects.filter(recipient=self.user).count(), 1)
+
+    def test_sync_submission_failure_returns_files_to_temp(self):
+        with mock.patch.object(Certificates.objects, 'bulk_create', side_effect=DatabaseError('down')):
+            response = self.client.post(reverse('applications:application-final') + f'?reward_id={self.reward.pk}')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Application.objects.exists())
+        self.assertTrue(default_storage.exists('temp_uploads/cert.pdf'))
+        self.assertIn('step3_data', DraftStore().get(self.draft_key))
+
+    def test_failed_submission_can_be_sent_again(self):
+        application, callbacks = self.submit_async()
+
+        # An unreachable broker marks the row failed instead of leaving it processing
+        broker_down = mock.patch.object(finalize_application_task, 'delay', side_effect=OperationalError('down'))
+        with broker_down, self.assertLogs('applications.services', 'WARNING'):
+            callbacks[0]()
+        application.refresh_from_db()
+        self.assertEqual(application.submission_status, 'failed')
+
+        response = self.client.get(reverse('applications:application-submission-status', args=[application.pk]))
+        self.assertEqual(response.data['submission_status'], 'failed')
+
+        retried, _ = self.submit_async()
+        self.assertNotEqual(retried.pk, application.pk)
+        self.assertFalse(Application.objects.filter(pk=application.pk).exists())
+        self.assertEqual(RewardStats.objects.get(reward=self.reward).total, 0)
+
+    def test_submission_status_is_private(self):
+        application = self.create_application(self.create_user(1), self.reward)
+        response = self.client.get(reverse('applications:application-submission-status', args=[application.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CertificateStagingTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.reward = self.create_reward()
+
+    def create_with_certificates(self, user, count):
+        serializer = ApplicationCreateSerializer(data={
+            'reward': self.reward.pk, 'area': 'Toshkent', 'district': 'Chilonzor',
+            'neighborhood': 'Mahalla', 'activity': 'Faoliyat', 'activity_description': 'Tavsif',
+            'certificates': [SimpleUploadedFile(f'c{i}.pdf', b'pdf') for i in range(count)],
+        }, context={'request': SimpleNamespace(user=user)})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as queries:
+            application = serializer.save()
+        return application, len(queries)
+
+    def test_certificate_inserts_do_not_depend_on_file_count(self):
+        _, one = self.create_with_certificates(self.create_user(0), 1)
+        application, five = self.create_with_certificates(self.create_user(1), 5)
+
+        self.assertEqual(one, five)
+        self.assertEqual(application.certificates_set.count(), 5)
+
+    def test_failed_attach_moves_files_back(self):
+        application = self.create_application(self.create_user(0), self.reward)
+        os.makedirs(os.path.join(self.media_root, 'temp_uploads'))
+        with open(os.path.join(self.media_root, 'temp_uploads', 'ok.pdf'), 'wb') as f:
+            f.write(b'pdf')
+
+        with self.assertRaises(PromoteError):
+            attach_submission_files(application, None, [
+                {'file_path': 'temp_uploads/ok.pdf', 'original_name': 'ok.pdf'},
+                {'file_path': 'temp_uploads/missing.pdf', 'original_name': 'missing.pdf'},
+            ])
+
+        self.assertTrue(default_storage.exists('temp_uploads/ok.pdf'))
+        self.assertFalse(default_storage.exists('certificates/ok.pdf'))
+        self.assertFalse(Certificates.objects.filter(application=application).exists())
+
+
+class DraftStoreTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        draft_cache.clear()
+        self.user = self.create_user(0)
+        self.reward = self.create_reward()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.key = f'application_draft_{self.user.pk}_{self.reward.pk}'
+
+    def test_steps_are_written_independently(self):
+        store = DraftStore()
+        store.update(self.key, {'step1_data': {'area': 'Toshkent'}, 'current_step': 1})
+        # A second tab that never saw step 1 saves step 2
+        store.update(self.key, {'step2_data': {'activity': 'Faoliyat'}, 'current_step': 2})
+
+        self.assertEqual(store.get(self.key), {
+            'step1_data': {'area': 'Toshkent'},
+            'step2_data': {'activity': 'Faoliyat'},
+            'current_step': 2,
+        })
+        self.assertEqual(store.get_field(self.key, 'step2_data'), {'activity': 'Faoliyat'})
+
+        store.delete(self.key)
+        self.assertEqual(store.get(self.key), {})
+
+    def test_step_views_use_the_draft(self):
+        params = f'?reward_id={self.reward.pk}'
+        response = self.client.post(reverse('applications:application-step2') + params, {
+            'activity': 'Faoliyat', 'activity_description': 'Tavsif'
+        })
+        self.assertEqual(response.status_code, 400)
+
+        DraftStore().update(self.key, {'step1_data': {'area': 'Toshkent'}})
+        response = self.client.post(reverse('applications:application-step2') + params, {
+            'activity': 'Faoliyat', 'activity_description': 'Tavsif'
+        })
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(reverse('applications:application-step2') + params)
+        self.assertEqual(response.data['data'], {'activity': 'Faoliyat', 'activity_description': 'Tavsif'})
+        self.assertEqual(DraftStore().get_field(self.key, 'step1_data'), {'area': 'Toshkent'})
+
+
+class TempUploadSweepTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(self.media_root, 'temp_uploads'))
+        self.user = self.create_user(0)
+
+    def write_temp(self, name, size):
+        with open(os.path.join(self.media_root, 'temp_uploads', name), 'wb') as f:
+            f.write(b'x' * size)
+        return {'file_path': f'temp_uploads/{name}', 'original_name': name, 'file_size': size}
+
+    def test_expired_draft_files_are_deleted(self):
+        kept = self.write_temp('kept.pdf', 10)
+        expired = self.write_temp('expired.pdf', 20)
+        register_draft_files('draft_live', self.user, [kept])
+        register_draft_files('draft_old', self.user, [expired])
+        DraftFile.objects.filter(draft_key='draft_old').update(expires_at=timezone.now())
+
+        reclaimed = sweep_temp_uploads(batch_size=1)
+
+        self.assertEqual(reclaimed, {'files': 1, 'bytes': 20})
+        self.assertTrue(default_storage.exists(kept['file_path']))
+        self.assertFalse(default_storage.exists(expired['file_path']))
+        self.assertEqual(list(DraftFile.objects.values_list('draft_key', flat=True)), ['draft_live'])
+
+    def test_resaving_step3_expires_replaced_files(self):
+        first = self.write_temp('first.pdf', 5)
+        second = self.write_temp('second.pdf', 5)
+        register_draft_files('draft', self.user, [first])
+        register_draft_files('draft', self.user, [second])
+
+        sweep_temp_uploads()
+        self.assertFalse(default_storage.exists(first['file_path']))
+        self.assertTrue(default_storage.exists(second['file_path']))
+
+    def test_unreferenced_files_are_deleted_after_grace_period(self):
+        orphan = self.write_temp('orphan.pdf', 7)
+
+        self.assertEqual(sweep_temp_uploads()['files'], 0)
+        with override_settings(TEMP_UPLOAD_ORPHAN_AGE=0):
+            self.assertEqual(sweep_temp_uploads(), {'files': 1, 'bytes': 7})
+        self.assertFalse(default_storage.exists(orphan['file_path']))
+
+
+class TransitionTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.reward = self.create_reward()
+        self.other_reward = self.create_reward('Boshqa')
+
+    def create_applications(self, count, reward=None, status='mahalla'):
+        start = CustomUser.objects.count()
+        return [
+            self.create_application(self.create_user(index), reward or self.reward, status=status)
+            for index in range(start, start + count)
+        ]
+
+    def test_single_transition_notifies_without_refetch(self):
+        from notifications.models import Notification
+
+        application = Application.objects.select_related('user', 'reward').get(
+            pk=self.create_applications(1)[0].pk
+        )
+        # UPDATE application, UPDATE counters (x2), INSERT notification
+        with self.assertNumQueries(4):
+            transition(application, 'tuman')
+
+        notification = Notification.objects.get(notification_type='application_updated')
+        self.assertEqual(notification.extra_data['old_status'], 'mahalla')
+        self.assertEqual(notification.extra_data['new_status'], 'tuman')
+
+    @mock.patch.dict(transitions._hooks)
+    def test_hooks_run_for_single_and_bulk_transitions(self):
+        entered = []
+
+        @on_enter('tuman')
+        def hook(application, old_status):
+            entered.append((application.pk, old_status, application.status))
+
+        single, bulk = self.create_applications(2)
+        transition(single, 'tuman')
+        bulk_transition([bulk.pk], 'tuman')
+
+        self.assertEqual(entered, [(single.pk, 'mahalla', 'tuman'), (bulk.pk, 'mahalla', 'tuman')])
+
+    def test_forbidden_transition(self):
+        application = self.create_applications(1, status='rad_etilgan')[0]
+        with self.assertRaises(TransitionError):
+            transition(application, 'mahalla')
+
+    def test_bulk_transition_query_count_is_constant(self):
+        from notifications.models import Notification
+
+        small = [application.pk for application in self.create_applications(1)]
+        large = [application.pk for application in self.create_applications(4)]
+        large += [application.pk for application in self.create_applications(3, reward=self.other_reward)]
+
+        with CaptureQueriesContext(connection) as first:
+            bulk_transition(small, 'tuman')
+        with CaptureQueriesContext(connection) as second:
+            bulk_transition(large, 'tuman')
+
+        self.assertEqual(len(first), len(second))
+        self.assertEqual(Notification.objects.filter(notification_type='application_updated').count(), 8)
+        self.assertEqual(RewardStats.objects.get(reward=self.reward).tuman, 5)
+        self.assertEqual(RewardStats.objects.get(reward=self.reward).mahalla, 0)
+        self.assertEqual(RewardStats.objects.get(reward=self.other_reward).tuman, 3)
+
+    def test_bulk_transition_reports_outcomes(self):
+        movable, = self.create_applications(1)
+        done, = self.create_applications(1, status='tuman')
+        final, = self.create_applications(1, status='mukofotlangan')
+
+        outcomes = bulk_transition([movable.pk, done.pk, final.pk, 999999], 'tuman')
+
+        self.assertEqual(outcomes, {
+            movable.pk: 'transitioned',
+            done.pk: 'unchanged',
+            final.pk: 'not_allowed',
+            999999: 'not_found',
+        })
+        self.assertEqual(Application.objects.get(pk=final.pk).status, 'mukofotlangan')
+
+    def test_bulk_transition_skips_unfinished_submissions(self):
+        from notifications.models import Notification
+
+        self.create_applications(1)
+        processing = self.create_application(
+            self.create_user(100), self.reward, status='mahalla', submission_status='processing'
+        )
+        stats = RewardStats.objects.filter(reward=self.reward).values('yuborilgan', 'mahalla', 'tuman').get()
+
+        self.assertEqual(bulk_transition([processing.pk], 'tuman'), {processing.pk: 'not_found'})
+        self.assertEqual(Application.objects.get(pk=processing.pk).status, 'mahalla')
+        self.assertEqual(
+            RewardStats.objects.filter(reward=self.reward).values('yuborilgan', 'mahalla', 'tuman').get(), stats
+        )
+        self.assertFalse(Notification.objects.filter(notification_type='application_updated').exists())
+
+
+class BulkTransitionViewTests(ApplicationTestMixin, TestCase):
+
+    def setUp(self):
+        self.reward = self.create_reward()
+        self.admin = self.create_user(0, is_staff=True, is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('applications:application-bulk-transition')
+
+    def test_transitions_grouped_by_target_status(self):
+        mahalla = [self.create_application(self.create_user(i), self.reward, status='mahalla') for i in (1, 2)]
+        hudud = self.create_application(self.create_user(3), self.reward, status='hudud')
+
+        response = self.client.post(self.url, {'transitions': [
+            {'status': 'tuman', 'ids': [mahalla[0].pk, mahalla[1].pk, hudud.pk]},
+            {'status': 'oxirgi_tasdiqlash', 'ids': [hudud.pk]},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        first, second = response.data['transitions']
+        self.assertEqual(first['summary'], {'transitioned': 2, 'not_allowed': 1})
+        self.assertEqual(first['results'][hudud.pk], 'not_allowed')
+        self.assertEqual(second['results'], {hudud.pk: 'transitioned'})
+        self.assertEqual(
+            sorted(Application.objects.values_list('status', flat=True)),
+            ['oxirgi_tasdiqlash', 'tuman', 'tuman']
+        )
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(self.create_user(1))
+        response = self.client.post(self.url, {'transitions': [{'status': 'tuman', 'ids': [1]}]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_admin_action(self):
+        application = self.create_application(self.create_user(1), self.reward, status='mahalla')
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:applications_application_changelist'), {
+            'action': 'transition_to_tuman',
+            '_selected_action': [application.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Application.objects.get(pk=application.pk).status, 'tuman')
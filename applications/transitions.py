@@ -0,0 +1,147 @@
+"""
+Application status workflow: allowed transitions, hooks and status notifications.
+
+    transition(application, 'tuman')          # one application
+    bulk_transition([1, 2, 3], 'tuman')       # many, in a constant number of queries
+
+Hooks registered with @on_enter('mukofotlangan') are called as
+hook(application, old_status) after the new status is saved, for single and
+bulk transitions alike (and for status changes saved directly, e.g. from the
+admin form).
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Application, RewardStats
+
+IN_PROCESS_STATUSES = ['mahalla', 'tuman', 'hudud']
+
+# Every stage moves one step forward or is rejected; mukofotlangan and rad_etilgan are final
+ALLOWED_TRANSITIONS = {
+    'yuborilgan': {'mahalla', 'rad_etilgan'},
+    'mahalla': {'tuman', 'rad_etilgan'},
+    'tuman': {'hudud', 'rad_etilgan'},
+    'hudud': {'oxirgi_tasdiqlash', 'rad_etilgan'},
+    'oxirgi_tasdiqlash': {'mukofotlangan', 'rad_etilgan'},
+    'mukofotlangan': set(),
+    'rad_etilgan': set(),
+}
+
+# Outcomes reported by bulk_transition
+TRANSITIONED = 'transitioned'
+NOT_FOUND = 'not_found'
+NOT_ALLOWED = 'not_allowed'
+UNCHANGED = 'unchanged'
+
+_hooks = defaultdict(list)
+
+
+class TransitionError(Exception):
+    pass
+
+
+def can_transition(old_status, new_status):
+    return new_status in ALLOWED_TRANSITIONS.get(old_status, ())
+
+
+def on_enter(*statuses):
+    """Register hook(application, old_status) to run when an application enters one of statuses"""
+    def decorator(func):
+        for status in statuses:
+            _hooks[status].append(func)
+        return func
+    return decorator
+
+
+def run_hooks(application, old_status):
+    for hook in _hooks[application.status]:
+        hook(application, old_status)
+
+
+def send_status_notification(application, old_status):
+    """Notify the applicant about the application's new status"""
+    from notifications.services import NotificationService
+
+    new_status = application.status
+    if new_status in IN_PROCESS_STATUSES:
+        NotificationService.create_application_in_process_notification(application, old_status)
+    elif new_status == 'oxirgi_tasdiqlash':
+        NotificationService.create_application_last_process_notification(application)
+    elif new_status == 'mukofotlangan':
+        NotificationService.create_application_won_notification(application)
+    elif new_status == 'rad_etilgan':
+        NotificationService.create_application_rejected_notification(application)
+
+
+def status_changed(application, old_status):
+    """Called by Application.save after a status change has been saved"""
+    run_hooks(application, old_status)
+    send_status_notification(application, old_status)
+
+
+def transition(application, new_status):
+    """Move one application to new_status, raising TransitionError if the workflow forbids it"""
+    if not can_transition(application.status, new_status):
+        raise TransitionError(
+            f"'{application.get_status_display()}' holatidan '{new_status}' holatiga o'tkazib bo'lmaydi"
+        )
+    application.status = new_status
+    application.save(update_fields=['status', 'updated_at'])
+    return application
+
+
+def bulk_transition(application_ids, new_status):
+    """
+    Move many applications to new_status at once. Returns {id: outcome}.
+
+    Costs the same number of queries for any number of ids: one SELECT, one
+    UPDATE of the applications, one UPDATE of the reward counters and one
+    bulk INSERT of the notifications.
+    """
+    from notifications.services import NotificationService
+
+    if new_status not in ALLOWED_TRANSITIONS:
+        raise TransitionError(f"Noma'lum holat: {new_status}")
+
+    outcomes = {application_id: NOT_FOUND for application_id in application_ids}
+
+    with transaction.atomic():
+        applications = list(
+            # Submissions still processing or failed aren't counted in RewardStats: not found here
+            Application.objects.submitted().select_for_update(of=('self',)).select_related('user', 'reward')
+            .filter(pk__in=outcomes.keys())
+        )
+
+        moved = []
+        for application in applications:
+            if application.status == new_status:
+                outcomes[application.pk] = UNCHANGED
+            elif can_transition(application.status, new_status):
+                outcomes[application.pk] = TRANSITIONED
+                moved.append((application, application.status))
+            else:
+                outcomes[application.pk] = NOT_ALLOWED
+
+        if not moved:
+            return outcomes
+
+        Application.objects.filter(pk__in=[application.pk for application, _ in moved]).update(
+            status=new_status,
+            updated_at=timezone.now()
+        )
+
+        deltas = defaultdict(Counter)
+        for application, old_status in moved:
+            deltas[application.reward_id][old_status] -= 1
+            deltas[application.reward_id][new_status] += 1
+        RewardStats.apply_bulk_delta(deltas)
+
+        # Hooks and notifications of every moved application end up in one bulk INSERT
+        with NotificationService.buffered():
+            for application, old_status in moved:
+                application.status = application._original_status = new_status
+                status_changed(application, old_status)
+
+    return outcomes
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import ChunkedUpload
+
+TEMP_UPLOAD_DIR = 'temp_uploads'
+
+# Chunks are copied from the request stream to disk in pieces of this size,
+# so memory use per request stays bounded whatever the chunk size
+STREAM_BUFFER_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 5 * 1024 * 1024
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+ALLOWED_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png', '.doc', '.docx']
+
+
+class ChunkError(Exception):
+    """Chunk cannot be accepted; `offset` is where the client should resume from"""
+
+    def __init__(self, message, offset=None):
+        super().__init__(message)
+        self.offset = offset
+
+
+def start_upload(user, filename, total_size):
+    """Reserve a temp file for a new chunked upload"""
+    extension = os.path.splitext(filename)[1].lower()
+    file_path = f"{TEMP_UPLOAD_DIR}/chunked_{uuid.uuid4()}{extension}"
+
+    full_path = default_storage.path(file_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    open(full_path, 'wb').close()
+
+    return ChunkedUpload.objects.create(
+        user=user,
+        filename=filename,
+        file_path=file_path,
+        total_size=total_size
+    )
+
+
+def write_chunk(upload_id, user, offset, stream, length):
+    """
+    Append `length` bytes from `stream` at `offset`.
+
+    The offset must match what the server has already stored, so a client that
+    lost a response can ask for the current offset and resume from there.
+    The chunk is spooled to a temp file first; the row is only locked to check
+    the offset again, copy the spooled bytes in place and advance it.
+    """
+    upload = ChunkedUpload.objects.get(pk=upload_id, user=user)
+    check_chunk(upload, offset, length)
+
+    with tempfile.TemporaryFile() as spool:
+        written = 0
+        while written < length:
+            data = stream.read(min(STREAM_BUFFER_SIZE, length - written))
+            if not data:
+                break
+            spool.write(data)
+            written += len(data)
+
+        if written != length:
+            raise ChunkError("Bo'lak to'liq qabul qilinmadi", upload.offset)
+
+        with transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().get(pk=upload_id, user=user)
+            # Another request may have stored this chunk while it was being received
+            check_chunk(upload, offset, length)
+
+            spool.seek(0)
+            with open(default_storage.path(upload.file_path), 'r+b') as destination:
+                destination.seek(offset)
+                shutil.copyfileobj(spool, destination, STREAM_BUFFER_SIZE)
+                destination.truncate()
+
+            upload.offset = offset + written
+            upload.save(update_fields=['offset', 'updated_at'])
+    return upload
+
+
+def check_chunk(upload, offset, length):
+    if upload.status != 'uploading':
+        raise ChunkError("Yuklash allaqachon yakunlangan", upload.offset)
+    if offset != upload.offset:
+        raise ChunkError("Noto'g'ri offset", upload.offset)
+    if length > MAX_CHUNK_SIZE:
+        raise ChunkError(f"Bo'lak hajmi {MAX_CHUNK_SIZE // (1024 * 1024)}MB dan oshmasligi kerak", upload.offset)
+    if offset + length > upload.total_size:
+        raise ChunkError("Bo'lak e'lon qilingan fayl hajmidan oshib ketdi", upload.offset)
+
+
+def complete_upload(upload):
+    if not upload.is_complete:
+        raise ChunkError("Fayl to'liq yuklanmagan", upload.offset)
+
+    if upload.status == 'uploading':
+        upload.status = 'completed'
+        upload.save(update_fields=['status', 'updated_at'])
+    return upload
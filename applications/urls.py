@@ -16,15 +16,23 @@ urlpatterns = [
     path('application/step2/', views.ApplicationStep2View.as_view(), name='application-step2'),
     path('application/step3/', views.ApplicationStep3View.as_view(), name='application-step3'),
     path('application/final-review/', views.ApplicationFinalReviewView.as_view(), name='application-final'),
+    path('application/<int:pk>/submission/', views.ApplicationSubmissionStatusView.as_view(),
+         name='application-submission-status'),
     path('application/status/', views.ApplicationStatusView.as_view(), name='application-status'),
     path('applications/list/', views.ApplicationsListView.as_view(), name='application-list'),
     path('applications/create/', views.ApplicationCreateView.as_view(), name='application-create'),
     path('my-applications/', views.MyApplicationsView.as_view(), name='my-applications'),
     path('applications/stats/', ApplicationStatsView.as_view(), name='application-stats'),
+    path('applications/bulk-transition/', views.ApplicationBulkTransitionView.as_view(),
+         name='application-bulk-transition'),
     path('applications/<int:application_id>/', ApplicationDetailView.as_view(), name='application-detail'),
 
     # File upload
     path('certificate/upload/', views.CertificateUploadView.as_view(), name='certificate-upload'),
+    path('application/uploads/', views.ChunkedUploadStartView.as_view(), name='chunked-upload-start'),
+    path('application/uploads/<uuid:upload_id>/', views.ChunkedUploadView.as_view(), name='chunked-upload'),
+    path('application/uploads/<uuid:upload_id>/complete/', views.ChunkedUploadCompleteView.as_view(),
+         name='chunked-upload-complete'),
 
     path('clear-draft/', views.clear_draft, name='clear-draft'),
 ]
@@ -1,20 +1,22 @@
 # views.py
 import os
 import uuid
+from collections import Counter
 
 from django.core.files.storage import default_storage
-from django.core.paginator import Paginator
+from django.db import transaction
 from django_filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, generics, viewsets
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.generics import get_object_or_404
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
-from django.core.cache import cache
 from rest_framework.decorators import action
-from .models import Application, Reward, Certificates
+from .models import Application, Reward, Certificates, ChunkedUpload
 from .serializers import (
     ApplicationStep1Serializer,
     ApplicationStep2Serializer,
@@ -23,10 +25,22 @@ from .serializers import (
     ApplicationDetailSerializer,
     ApplicationSessionSerializer,
     CertificateUploadSerializer, RewardListSerializer, RewardCreateUpdateSerializer, RewardDetailSerializer,
-    ApplicationListSerializer, ApplicationCreateSerializer
+    ApplicationListSerializer, ApplicationCreateSerializer, StatsQuerySerializer,
+    ApplicationsListItemSerializer, ChunkedUploadStartSerializer, ChunkedUploadSerializer,
+    BulkTransitionRequestSerializer
 )
-from django.db.models import Q, Count
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .drafts import (
+    DraftStore, expire_draft_files, register_draft_files, release_draft_files, touch_draft_files
+)
+from .pagination import ApplicationPagination
 from .permissions import RewardPermission
+from .search import search_applications
+from .stats import application_stats, status_breakdown, histogram
+from .storage import FileStaging
+from .transitions import bulk_transition
+from .uploads import ChunkError, MAX_CHUNK_SIZE, complete_upload, start_upload, write_chunk
 
 
 class RewardViewSet(viewsets.ModelViewSet):
@@ -44,16 +58,13 @@ class RewardViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
 
     def get_queryset(self):
+        # Counters come from the denormalized RewardStats row (one LEFT JOIN per reward)
+        # instead of aggregating the whole Application table on every request
+        pending = F('stats__yuborilgan') + F('stats__mahalla') + F('stats__tuman') + F('stats__hudud')
         queryset = Reward.objects.annotate(
-            applications_count=Count('applications'),
-            pending_applications=Count(
-                'applications',
-                filter=Q(applications__status__in=['yuborilgan', 'mahalla', 'tuman', 'hudud'])
-            ),
-            approved_applications=Count(
-                'applications',
-                filter=Q(applications__status='mukofotlangan')
-            )
+            applications_count=Coalesce('stats__total', 0),
+            pending_applications=Coalesce(pending, 0),
+            approved_applications=Coalesce('stats__mukofotlangan', 0)
         )
         return queryset
 
@@ -175,51 +186,28 @@ class RewardViewSet(viewsets.ModelViewSet):
                 'message': 'Ruxsat yo\'q'
             }, status=status.HTTP_403_FORBIDDEN)
 
-        reward = self.get_object()
-        applications = reward.applications.all()
-
-        stats = {
-            'total_applications': applications.count(),
-            'status_breakdown': {},
-            'monthly_applications': [],
-        }
-
-        # Status breakdown
-        for status_code, status_name in Application.STATUS_CHOICES:
-            count = applications.filter(status=status_code).count()
-            stats['status_breakdown'][status_code] = {
-                'name': status_name,
-                'count': count
-            }
-
-        # Monthly applications (last 12 months)
-        from django.utils import timezone
-        from dateutil.relativedelta import relativedelta
-
-        end_date = timezone.now()
-        start_date = end_date - relativedelta(months=12)
-
-        # This is a simplified version - you might want to use Django's aggregation
-        monthly_data = []
-        current_date = start_date
-
-        while current_date <= end_date:
-            month_start = current_date.replace(day=1)
-            next_month = month_start + relativedelta(months=1)
-
-            count = applications.filter(
-                created_at__gte=month_start,
-                created_at__lt=next_month
-            ).count()
-
-            monthly_data.append({
-                'month': month_start.strftime('%Y-%m'),
-                'count': count
-            })
+        params = StatsQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response({
+                'success': False,
+                'errors': params.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-            current_date = next_month
+        reward = self.get_object()
+        bucket = params.validated_data['bucket']
+        stats = application_stats(
+            reward.applications.submitted(),
+            start_date=params.validated_data.get('date_from'),
+            end_date=params.validated_data.get('date_to'),
+            bucket=bucket
+        )
 
-        stats['monthly_applications'] = monthly_data
+        # Kept for clients built against the old month-only response
+        if bucket == 'month':
+            stats['monthly_applications'] = [
+                {'month': item['period'], 'count': item['count']}
+                for item in stats['histogram']['series']
+            ]
 
         return Response({
             'success': True,
@@ -248,29 +236,41 @@ class MultiStepApplicationMixin:
         return f"application_draft_{user_id}_{reward_id}"
 
     def get_session_data(self, request):
-        """Get application data from session/cache"""
-        session_key = self.get_session_key(request)
-        return cache.get(session_key, {})
+        """Get the whole application draft"""
+        return DraftStore().get(self.get_session_key(request))
+
+    def get_step_data(self, request, step):
+        """Get a single step of the draft without loading the others"""
+        return DraftStore().get_field(self.get_session_key(request), f'step{step}_data', {})
+
+    def has_steps(self, request, *steps):
+        fields = [f'step{step}_data' for step in steps]
+        return len(DraftStore().get_fields(self.get_session_key(request), *fields)) == len(fields)
 
     def save_session_data(self, request, data, step=None):
-        """Save application data to session/cache"""
+        """Save a step (or the given fields) of the draft; returns the fields written"""
         session_key = self.get_session_key(request)
-        session_data = self.get_session_data(request)
 
         if step:
-            session_data[f'step{step}_data'] = data
-            session_data['current_step'] = step
+            fields = {f'step{step}_data': data, 'current_step': step}
         else:
-            session_data.update(data)
+            fields = dict(data)
 
         # Save reward_id in session for consistency
         if 'reward_id' in data:
             request.session['application_reward_id'] = data['reward_id']
-            session_data['reward_id'] = data['reward_id']
+            fields['reward_id'] = data['reward_id']
 
-        # Cache for 1 hour
-        cache.set(session_key, session_data, 3600)
-        return session_data
+        # Only these fields are written; the draft expires an hour after the last write
+        DraftStore().update(session_key, fields)
+        touch_draft_files(session_key)
+        return fields
+
+    def clear_session_data(self, request):
+        """Drop a submitted draft; its files now belong to the application"""
+        session_key = self.get_session_key(request)
+        DraftStore().delete(session_key)
+        release_draft_files(session_key)
 
 
 class ApplicationStep1View(MultiStepApplicationMixin, APIView):
@@ -283,8 +283,7 @@ class ApplicationStep1View(MultiStepApplicationMixin, APIView):
 
     def get(self, request):
         """Get current step 1 data"""
-        session_data = self.get_session_data(request)
-        step1_data = session_data.get('step1_data', {})
+        step1_data = self.get_step_data(request, 1)
 
         # Pre-fill with user data if available
         if not step1_data and request.user:
@@ -314,7 +313,7 @@ class ApplicationStep1View(MultiStepApplicationMixin, APIView):
             existing_application = Application.objects.filter(
                 user=request.user,
                 reward_id=reward_id
-            ).first()
+            ).exclude(submission_status='failed').first()
 
             if existing_application:
                 return Response({
@@ -325,7 +324,7 @@ class ApplicationStep1View(MultiStepApplicationMixin, APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             # Save to session
-            session_data = self.save_session_data(
+            self.save_session_data(
                 request,
                 serializer.validated_data,
                 step=1
@@ -352,8 +351,7 @@ class ApplicationStep2View(MultiStepApplicationMixin, APIView):
 
     def get(self, request):
         """Get current step 2 data"""
-        session_data = self.get_session_data(request)
-        step2_data = session_data.get('step2_data', {})
+        step2_data = self.get_step_data(request, 2)
 
         return Response({
             'success': True,
@@ -364,8 +362,7 @@ class ApplicationStep2View(MultiStepApplicationMixin, APIView):
     def post(self, request):
         """Save step 2 data and proceed to step 3"""
         # Check if step 1 is completed
-        session_data = self.get_session_data(request)
-        if 'step1_data' not in session_data:
+        if not self.has_steps(request, 1):
             return Response({
                 'success': False,
                 'message': 'Avval 1-qadamni yakunlang'
@@ -402,8 +399,7 @@ class ApplicationStep3View(MultiStepApplicationMixin, APIView):
 
     def get(self, request):
         """Get current step 3 data"""
-        session_data = self.get_session_data(request)
-        step3_data = session_data.get('step3_data', {})
+        step3_data = self.get_step_data(request, 3)
 
         return Response({
             'success': True,
@@ -414,16 +410,21 @@ class ApplicationStep3View(MultiStepApplicationMixin, APIView):
     def post(self, request):
         """Save step 3 data and proceed to final review"""
         # Check if previous steps are completed
-        session_data = self.get_session_data(request)
-        if 'step1_data' not in session_data or 'step2_data' not in session_data:
+        if not self.has_steps(request, 1, 2):
             return Response({
                 'success': False,
                 'message': 'Avval oldingi qadamlarni yakunlang'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = ApplicationStep3Serializer(data=request.data)
+        serializer = ApplicationStep3Serializer(data=request.data, context={'request': request})
 
-        if serializer.is_valid():
+        # Uploads are checked and attached under one lock, so two requests can't attach the same one
+        with transaction.atomic():
+            is_valid = serializer.is_valid()
+            if is_valid:
+                serializer.attach_uploads()
+
+        if is_valid:
             validated_data = serializer.validated_data.copy()
 
             # Prepare data for session storage (JSON serializable)
@@ -448,11 +449,13 @@ class ApplicationStep3View(MultiStepApplicationMixin, APIView):
                     'file_path': file_path,
                     'file_size': rec_file.size
                 }
+            elif validated_data['recommendation_letter_upload']:
+                # Already on disk through the chunked upload API
+                session_data['recommendation_letter'] = validated_data['recommendation_letter_upload'].as_file_data()
 
             # Handle certificates
+            certificates_data = []
             if 'certificates' in validated_data and validated_data['certificates']:
-                certificates_data = []
-
                 for cert_file in validated_data['certificates']:
                     # Generate unique filename
                     file_extension = os.path.splitext(cert_file.name)[1]
@@ -470,10 +473,17 @@ class ApplicationStep3View(MultiStepApplicationMixin, APIView):
                         'file_size': cert_file.size
                     })
 
+            certificates_data.extend(upload.as_file_data() for upload in validated_data['certificate_uploads'])
+            if certificates_data:
                 session_data['certificates'] = certificates_data
 
             # Save to session (now JSON serializable)
             self.save_session_data(request, session_data, step=3)
+            # Temp files are deleted by the sweeper if the draft is abandoned
+            draft_files = list(certificates_data)
+            if 'recommendation_letter' in session_data:
+                draft_files.append(session_data['recommendation_letter'])
+            register_draft_files(self.get_session_key(request), request.user, draft_files)
 
             # Prepare response data
             response_data = {}
@@ -565,10 +575,11 @@ class ApplicationFinalReviewView(MultiStepApplicationMixin, APIView):
         # Prepare final data from session
         final_data = {}
         reward_id = session_data.get('step1_data', {}).get('reward_id')
+        # A failed asynchronous submission can be sent again, it is replaced
         existing_application = Application.objects.filter(
             user=request.user,
             reward_id=reward_id
-        ).first()
+        ).exclude(submission_status='failed').first()
 
         if existing_application:
             return Response({
@@ -610,18 +621,36 @@ class ApplicationFinalReviewView(MultiStepApplicationMixin, APIView):
 
         final_data['source'] = 'web'
 
+        # ?async=true: reserve the application now, move files and notify in a Celery task
+        is_async = request.query_params.get('async', '').lower() == 'true'
+
         # Create final application using the fixed serializer
         serializer = ApplicationFinalSerializer(
             data=final_data,
-            context={'request': request}
+            context={'request': request, 'async': is_async, 'draft_key': self.get_session_key(request)}
         )
 
         if serializer.is_valid():
             try:
-                application = serializer.create(serializer.validated_data)
+                # Outside the transaction, so promoted files go back to temp storage if it rolls back
+                with FileStaging() as staging, transaction.atomic():
+                    serializer.context['staging'] = staging
+                    application = serializer.create(serializer.validated_data)
+
+                if is_async:
+                    # The draft is kept until finalize_application_task succeeds, so a failed submission can be retried
+                    return Response({
+                        'success': True,
+                        'message': 'Ariza qabul qilindi va qayta ishlanmoqda',
+                        'application_id': application.id,
+                        'submission_status': application.submission_status,
+                        'status_url': reverse(
+                            'applications:application-submission-status', args=[application.id], request=request
+                        )
+                    }, status=status.HTTP_202_ACCEPTED)
 
                 # Clear session data after successful submission
-                cache.delete(self.get_session_key(request))
+                self.clear_session_data(request)
                 if 'application_reward_id' in request.session:
                     del request.session['application_reward_id']
 
@@ -645,6 +674,61 @@ class ApplicationFinalReviewView(MultiStepApplicationMixin, APIView):
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+
+class ApplicationSubmissionStatusView(APIView):
+    """Poll an asynchronous submission started with POST final-review/?async=true"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        application = get_object_or_404(
+            Application.objects.select_related('user', 'reward'), pk=pk, user=request.user
+        )
+
+        data = {
+            'success': True,
+            'application_id': application.id,
+            'submission_status': application.submission_status,
+            'submission_status_display': application.get_submission_status_display(),
+        }
+        if application.submission_status == 'failed':
+            data['message'] = 'Arizani saqlashda xatolik yuz berdi'
+        elif application.submission_status == 'completed':
+            data['application'] = ApplicationDetailSerializer(application, context={'request': request}).data
+        return Response(data)
+
+
+class ApplicationBulkTransitionView(APIView):
+    """
+    Move many applications to new statuses in one call (reviewers only).
+
+    Body: {"transitions": [{"status": "tuman", "ids": [1, 2, 3]}, ...]}
+    Every id gets an outcome: transitioned, unchanged, not_allowed or not_found.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkTransitionRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        for item in serializer.validated_data['transitions']:
+            outcomes = bulk_transition(item['ids'], item['status'])
+            results.append({
+                'status': item['status'],
+                'summary': Counter(outcomes.values()),
+                'results': outcomes
+            })
+
+        return Response({
+            'success': True,
+            'transitions': results
+        })
+
+
 class ApplicationStatusView(MultiStepApplicationMixin, APIView):
     """Get current application progress status"""
     permission_classes = [IsAuthenticated]
@@ -730,16 +814,17 @@ class ApplicationListView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'area', 'reward']
     ordering = ['-created_at']
+    pagination_class = ApplicationPagination
 
     def get_queryset(self):
         if self.request.user.is_staff:
             # Admin users see all applications
-            return Application.objects.select_related(
+            return Application.objects.submitted().select_related(
                 'user', 'reward'
             ).prefetch_related('certificates_set')
         else:
             # Regular users see only their own applications
-            return Application.objects.filter(
+            return Application.objects.submitted().filter(
                 user=self.request.user
             ).select_related(
                 'user', 'reward'
@@ -753,9 +838,10 @@ class MyApplicationsView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'area', 'reward']
     ordering = ['-created_at']
+    pagination_class = ApplicationPagination
 
     def get_queryset(self):
-        return Application.objects.filter(
+        return Application.objects.submitted().filter(
             user=self.request.user
         ).select_related(
             'user', 'reward'
@@ -771,10 +857,11 @@ class RewardApplicationsView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'area']
     ordering = ['-created_at']
+    pagination_class = ApplicationPagination
 
     def get_queryset(self):
         reward_id = self.kwargs['reward_id']
-        return Application.objects.filter(
+        return Application.objects.submitted().filter(
             reward_id=reward_id
         ).select_related(
             'user', 'reward'
@@ -788,7 +875,8 @@ def clear_draft(request):
     reward_id = request.query_params.get('reward_id')
     if reward_id:
         session_key = f"application_draft_{request.user.id}_{reward_id}"
-        cache.delete(session_key)
+        DraftStore().delete(session_key)
+        expire_draft_files(session_key)
 
     return Response({
         'success': True,
@@ -804,23 +892,19 @@ class ApplicationsListView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
-        """Get applications list based on user role"""
-
-        # Get query parameters
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 10))
+    def get_queryset(self):
+        """Filtered listing, newest first; ApplicationQueryPlanTests checks its query plans"""
+        request = self.request
         status_filter = request.query_params.get('status')  # Filter by status
         reward_id = request.query_params.get('reward_id')  # Filter by reward
-        search = request.query_params.get('search')  # Search by user name or PINFL
 
-        # Base queryset
+        # Base queryset; submissions still being processed are only visible through their status URL
         if request.user.is_staff or request.user.is_superuser:
             # Admin/Staff can see all applications
-            queryset = Application.objects.all()
+            queryset = Application.objects.submitted()
         else:
             # Regular users see only their applications
-            queryset = Application.objects.filter(user=request.user)
+            queryset = Application.objects.submitted().filter(user=request.user)
 
         # Apply filters
         if status_filter:
@@ -829,62 +913,55 @@ class ApplicationsListView(APIView):
         if reward_id:
             queryset = queryset.filter(reward_id=reward_id)
 
+        # Order by creation date (newest first); certificates are counted in the same query, as
+        # a subquery: a joined COUNT needs a GROUP BY, which the created_at indexes can't order
+        certificates_count = Certificates.objects.filter(
+            application=OuterRef('pk')
+        ).order_by().values('application').annotate(count=Count('pk')).values('count')
+        return queryset.select_related('user', 'reward').only(
+            *ApplicationsListItemSerializer.ONLY_FIELDS
+        ).annotate(
+            certificates_count=Coalesce(Subquery(certificates_count), 0)
+        ).order_by('-created_at')
+
+    def filter_queryset(self, queryset):
+        """Indexed search: PINFL prefix or full-text, best matches first"""
+        self.search_mode = None
+        search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(user__pinfl__icontains=search) |
-                Q(reward__name__icontains=search)
-            )
+            queryset, self.search_mode = search_applications(queryset, search)
+        return queryset
+
+    def get(self, request):
+        """Get applications list based on user role"""
+
+        # Get query parameters
+        status_filter = request.query_params.get('status')  # Filter by status
+        reward_id = request.query_params.get('reward_id')  # Filter by reward
+        search = request.query_params.get('search')  # Search by user name or PINFL
 
-        # Order by creation date (newest first)
-        queryset = queryset.select_related('user', 'reward').order_by('-created_at')
+        queryset = self.filter_queryset(self.get_queryset())
 
-        # Pagination
-        paginator = Paginator(queryset, page_size)
-        page_obj = paginator.get_page(page)
+        # Bounded page_size, cached totals for large result sets, opt-in cursor mode
+        paginator = ApplicationPagination()
+        page_items = paginator.paginate_queryset(queryset, request, view=self)
 
         # Serialize data
-        applications_data = []
-        for app in page_obj:
-            applications_data.append({
-                'ariza_raqami': app.id,  # Application ID
-                'xizmat_nomi': app.reward.name,  # Reward name
-                'yuborilgan_kuni': app.created_at.strftime('%d.%m.%Y'),  # Created date
-                'holati': app.get_status_display(),  # Status display
-                'holati_code': app.status,  # Status code for frontend logic
-                'manba': app.get_source_display() if hasattr(app, 'get_source_display') else app.source,  # Source
-
-                # Additional info (especially useful for admins)
-                'foydalanuvchi': f"{app.user.first_name} {app.user.last_name}" if request.user.is_staff else None,
-                'pinfl': app.user.pinfl if request.user.is_staff else None,
-                'telefon': app.user.phone_number if request.user.is_staff else None,
-                'hudud': app.get_area_display() if request.user.is_staff else None,
-
-                # File counts
-                'tavsiya_xati': 'Mavjud' if app.recommendation_letter else 'Mavjud emas',
-                'sertifikatlar_soni': app.certificates_set.count() if hasattr(app, 'certificates_set') else 0,
-
-                # Timestamps
-                'yaratilgan_vaqt': app.created_at.strftime('%d.%m.%Y %H:%M'),
-                'yangilangan_vaqt': app.updated_at.strftime('%d.%m.%Y %H:%M') if hasattr(app, 'updated_at') else None,
-            })
+        applications_data = ApplicationsListItemSerializer(
+            page_items,
+            many=True,
+            context={'is_admin': request.user.is_staff}
+        ).data
 
         return Response({
             'success': True,
             'data': applications_data,
-            'pagination': {
-                'current_page': page,
-                'total_pages': paginator.num_pages,
-                'total_count': paginator.count,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
-                'page_size': page_size
-            },
+            'pagination': paginator.get_pagination_data(),
             'filters': {
                 'status': status_filter,
                 'reward_id': reward_id,
-                'search': search
+                'search': search,
+                'search_mode': self.search_mode
             },
             'user_role': 'admin' if request.user.is_staff else 'user'
         })
@@ -902,9 +979,9 @@ class ApplicationDetailView(APIView):
         """Get detailed application information"""
         try:
             if request.user.is_staff or request.user.is_superuser:
-                application = Application.objects.select_related('user', 'reward').get(id=application_id)
+                application = Application.objects.submitted().select_related('user', 'reward').get(id=application_id)
             else:
-                application = Application.objects.select_related('user', 'reward').get(
+                application = Application.objects.submitted().select_related('user', 'reward').get(
                     id=application_id,
                     user=request.user
                 )
@@ -995,26 +1072,39 @@ class ApplicationStatsView(APIView):
                 'message': 'Bu ma\'lumotlarga faqat administratorlar kirishi mumkin'
             }, status=status.HTTP_403_FORBIDDEN)
 
-        # Get statistics
-        from django.db.models import Count
-
-        total_applications = Application.objects.count()
+        params = StatsQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response({
+                'success': False,
+                'errors': params.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Status breakdown
-        status_stats = Application.objects.values('status').annotate(count=Count('status'))
-        status_breakdown = {stat['status']: stat['count'] for stat in status_stats}
+        # Status breakdown (one grouped query, total is derived from it)
+        submitted = Application.objects.submitted()
+        breakdown = status_breakdown(submitted)
+        status_counts = {code: item['count'] for code, item in breakdown.items()}
+        total_applications = sum(status_counts.values())
 
         # Source breakdown
-        source_stats = Application.objects.values('source').annotate(count=Count('source'))
+        source_stats = submitted.values('source').annotate(count=Count('source'))
         source_breakdown = {stat['source']: stat['count'] for stat in source_stats}
 
         # Recent applications (last 7 days)
-        from datetime import datetime, timedelta
-        recent_date = datetime.now() - timedelta(days=7)
-        recent_applications = Application.objects.filter(created_at__gte=recent_date).count()
+        from datetime import timedelta
+        from django.utils import timezone
+        recent_date = timezone.now() - timedelta(days=7)
+        recent_applications = submitted.filter(created_at__gte=recent_date).count()
+
+        bucket = params.validated_data['bucket']
+        series = histogram(
+            submitted,
+            start_date=params.validated_data.get('date_from'),
+            end_date=params.validated_data.get('date_to'),
+            bucket=bucket
+        )
 
         # Top rewards by application count
-        reward_stats = Application.objects.values('reward__name').annotate(
+        reward_stats = submitted.values('reward__name').annotate(
             count=Count('reward')
         ).order_by('-count')[:5]
 
@@ -1022,9 +1112,112 @@ class ApplicationStatsView(APIView):
             'success': True,
             'stats': {
                 'umumiy_arizalar': total_applications,
-                'holat_boyicha': status_breakdown,
+                'holat_boyicha': status_counts,
                 'manba_boyicha': source_breakdown,
                 'oxirgi_7_kun': recent_applications,
-                'eng_kop_arizalar': list(reward_stats)
+                'eng_kop_arizalar': list(reward_stats),
+                'histogram': {
+                    'bucket': bucket,
+                    'series': series,
+                }
             }
-        })
\ No newline at end of file
+        })
+
+
+class ChunkedUploadStartView(APIView):
+    """
+    Start a resumable upload (init).
+    Then PUT raw chunks to the upload URL with ?offset=<bytes already stored>
+    and POST .../complete/ once every byte has been sent.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ChunkedUploadStartSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = start_upload(
+            request.user,
+            serializer.validated_data['filename'],
+            serializer.validated_data['size']
+        )
+        return Response({
+            'success': True,
+            'upload': ChunkedUploadSerializer(upload).data,
+            'max_chunk_size': MAX_CHUNK_SIZE
+        }, status=status.HTTP_201_CREATED)
+
+
+class ChunkedUploadView(APIView):
+    """
+    GET: current offset, to resume an interrupted upload
+    PUT: raw chunk body written at ?offset=, streamed to disk with bounded memory
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, upload_id):
+        upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+        return Response({
+            'success': True,
+            'upload': ChunkedUploadSerializer(upload).data
+        })
+
+    def put(self, request, upload_id):
+        get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({
+                'success': False,
+                'message': 'offset va Content-Length majburiy'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if length <= 0:
+            return Response({
+                'success': False,
+                'message': 'Bo\'lak bo\'sh'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # request.stream is the raw body: reading it never goes through the parsers
+            upload = write_chunk(upload_id, request.user, offset, request.stream, length)
+        except ChunkError as e:
+            return Response({
+                'success': False,
+                'message': str(e),
+                'offset': e.offset
+            }, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'success': True,
+            'upload': ChunkedUploadSerializer(upload).data
+        })
+
+
+class ChunkedUploadCompleteView(APIView):
+    """Finish a chunked upload; its id can then be sent to step 3"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, upload_id):
+        upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+
+        try:
+            upload = complete_upload(upload)
+        except ChunkError as e:
+            return Response({
+                'success': False,
+                'message': str(e),
+                'offset': e.offset
+            }, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'success': True,
+            'message': 'Fayl yuklandi',
+            'upload': ChunkedUploadSerializer(upload).data
+        })
@@ -0,0 +1,13 @@
+"""
+Cache namespaces (aliases configured from CACHE_NAMESPACES in settings).
+
+    from config.cache import draft_cache
+    draft_cache.set(key, value)  # expires after the namespace TTL
+"""
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+signup_cache = ConnectionProxy(caches, 'signup')
+draft_cache = ConnectionProxy(caches, 'drafts')
+count_cache = ConnectionProxy(caches, 'counts')
+lock_cache = ConnectionProxy(caches, 'locks')
@@ -200,8 +200,91 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Application listings: page_size cap and cached totals for large result sets
+APPLICATIONS_MAX_PAGE_SIZE = 100
+APPLICATIONS_APPROXIMATE_COUNT_THRESHOLD = 10000
+APPLICATIONS_COUNT_REFRESH_INTERVAL = 60  # seconds before a cached total is recounted
+APPLICATIONS_COUNT_CACHE_TIMEOUT = 60 * 60
+# Most application ids accepted per target status by the bulk transition endpoint
+APPLICATIONS_BULK_TRANSITION_MAX_IDS = 10000
+# Dotted path to an applications.search.SearchBackend; None picks the one matching the database
+APPLICATIONS_SEARCH_BACKEND = None
+
+# Temp uploads (media/temp_uploads): files of expired drafts are deleted by a periodic sweep,
+# unreferenced files once they are older than TEMP_UPLOAD_ORPHAN_AGE seconds
+TEMP_UPLOAD_ORPHAN_AGE = 24 * 60 * 60
+TEMP_UPLOAD_SWEEP_BATCH_SIZE = 500
+
+# Notification outbox (notifications/outbox.py): channels are dotted paths to
+# callables that receive a list of notifications and raise if delivery fails
+NOTIFICATION_CHANNELS = ['notifications.pubsub.publish_notifications']
+NOTIFICATION_DELIVERY_BATCH_SIZE = 500
+NOTIFICATION_DELIVERY_LEASE = 5 * 60  # seconds a claimed batch stays hidden from other workers
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BASE_DELAY = 30  # seconds, doubled after every failed attempt
+NOTIFICATION_RETRY_MAX_DELAY = 60 * 60
+# Users recounted per query by the cached notification counter reconciliation
+NOTIFICATION_COUNTER_RECONCILE_BATCH_SIZE = 1000
+# Retention (notifications/retention.py): delivered notifications older than these
+# many days are moved to the archive table, read ones sooner than unread ones
+NOTIFICATION_RETENTION_READ_DAYS = 90
+NOTIFICATION_RETENTION_UNREAD_DAYS = 365
+NOTIFICATION_ARCHIVE_BATCH_SIZE = 1000
+
+# Notification stream (notifications/stream.py): RedisBroker fans events out to every
+# server process, LocalBroker only reaches connections of the publishing process
+NOTIFICATION_PUBSUB_BACKEND = 'notifications.pubsub.RedisBroker'
+NOTIFICATION_PUBSUB_URL = "redis://localhost:6379/0"
+NOTIFICATION_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+NOTIFICATION_STREAM_RETRY = 3  # seconds the browser waits before reconnecting
+NOTIFICATION_STREAM_QUEUE_SIZE = 100  # events buffered per connection before it is told to resync
+
 CELERY_BROKER_URL = "redis://localhost:6379/0"
 CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
+CELERY_BEAT_SCHEDULE = {
+    'sweep-temp-uploads': {
+        'task': 'applications.tasks.sweep_temp_uploads_task',
+        'schedule': 15 * 60,
+    },
+    'deliver-notifications': {
+        'task': 'notifications.tasks.deliver_notifications_task',
+        'schedule': 30,
+    },
+    'reconcile-notification-counts': {
+        'task': 'notifications.tasks.reconcile_notification_counts_task',
+        'schedule': 60 * 60,
+    },
+    'archive-notifications': {
+        'task': 'notifications.tasks.archive_notifications_task',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Cache: shared by all workers in Redis (a separate database from the Celery broker).
+# Every namespace is its own alias with its own key prefix and TTL (see config/cache.py);
+# since every key has a TTL, Redis should run with maxmemory-policy volatile-lru.
+REDIS_CACHE_URL = "redis://localhost:6379/1"
+CACHE_NAMESPACES = {
+    'signup': 5 * 60,  # signup_data_* between registration and SMS verification
+    'drafts': 60 * 60,  # multi-step application drafts
+    'counts': APPLICATIONS_COUNT_CACHE_TIMEOUT,  # cached listing totals
+    'locks': 60,  # short-lived markers that deduplicate scheduled tasks
+}
+
+
+def cache_config(prefix, timeout):
+    return {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+        'KEY_PREFIX': prefix,
+        'TIMEOUT': timeout,
+    }
+
+
+CACHES = {
+    'default': cache_config('grant', 5 * 60),
+    **{name: cache_config(f'grant:{name}', timeout) for name, timeout in CACHE_NAMESPACES.items()},
+}
 
 AWS_ACCESS_KEY_ID = "your-access-key-id#vleyvwfewyuta%#bfkebkuf"
 AWS_SECRET_ACCESS_KEY = "your-secret-access-keyeuifbweyutabfukebfa@bkdhj"
@@ -209,6 +292,14 @@ AWS_REGION = "us-east-1"
 
 ESKIZ_EMAIL = "email@example.com"
 ESKIZ_PASSWORD = "password" # I changed
+ESKIZ_BASE_URL = "https://notify.eskiz.uz/api"
+ESKIZ_SENDER = "4546"
+ESKIZ_TOKEN_LIFETIME = 29 * 24 * 60 * 60  # used when the token carries no exp claim
+
+# SMS gateway (accounts/sms.py): one client per process with a pooled HTTP session
+SMS_GATEWAY = 'accounts.sms.EskizGateway'
+SMS_GATEWAY_TIMEOUT = 10  # seconds
+SMS_GATEWAY_POOL_SIZE = 10
 
 JAZZMIN_SETTINGS = {
     "site_title": "Grand MVP Admin",          # Brauzer title
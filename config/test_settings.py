@@ -0,0 +1,19 @@
+"""
+Settings for the test suite: `python manage.py test` uses this module unless
+DJANGO_SETTINGS_MODULE says otherwise, so no Redis is needed to run it.
+"""
+from .settings import *  # noqa: F401,F403
+
+# Streams of the test process only
+NOTIFICATION_PUBSUB_BACKEND = 'notifications.pubsub.LocalBroker'
+
+# Every cache namespace in process memory, each alias in its own store
+CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': config['KEY_PREFIX'],
+        'TIMEOUT': config['TIMEOUT'],
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    }
+    for alias, config in CACHES.items()  # noqa: F405
+}
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Notification
+from .models import ArchivedNotification, Notification
+from .read_state import with_read_state
 
 
 @admin.register(Notification)
@@ -9,7 +10,18 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ('title', 'recipient__email')
     readonly_fields = ('content_type', 'object_id', 'sent_time', 'created_time',)
 
+    def get_queryset(self, request):
+        return with_read_state(super().get_queryset(request))
+
     def is_read(self, obj):
         return obj.is_read
 
-    is_read.boolean = True
\ No newline at end of file
+    is_read.boolean = True
+
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ('title', 'recipient', 'notification_type', 'created_time', 'archived_at')
+    list_filter = ('notification_type',)
+    search_fields = ('title', 'recipient__email')
+    list_select_related = ('recipient',)
@@ -0,0 +1,109 @@
+"""
+Per-user notification counters (total and unread) kept in the counts cache.
+
+`unread` counts notifications that have not been read, whatever their
+delivery status: a pending or failed notification is as unread as a sent one.
+
+Counters are computed with one query on a cache miss and then adjusted with
+atomic INCR/DECR after every commit that creates or reads notifications, so
+listing and stats requests no longer COUNT. Counters that are not cached are
+left alone (the next read computes them), and reconcile_counts() corrects any
+drift, e.g. after notifications were deleted.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from config.cache import count_cache
+from .models import Notification
+from .read_state import unread_q
+
+
+def counter_key(user_id, name):
+    return f"notification_{name}_{user_id}"
+
+
+def count_notifications(user_ids):
+    """{user id: {'total', 'unread'}} from the database"""
+    rows = (
+        Notification.objects.filter(recipient_id__in=user_ids).order_by()
+        .values('recipient_id')
+        .annotate(total=Count('id'), unread=Count('id', filter=unread_q()))
+    )
+    counts = {user_id: {'total': 0, 'unread': 0} for user_id in user_ids}
+    for row in rows:
+        counts[row['recipient_id']] = {'total': row['total'], 'unread': row['unread']}
+    return counts
+
+
+def get_counts(user_id):
+    """{'total': ..., 'unread': ...} for a user"""
+    keys = {name: counter_key(user_id, name) for name in ('total', 'unread')}
+    cached = count_cache.get_many(keys.values())
+    if len(cached) == len(keys):
+        return {name: cached[key] for name, key in keys.items()}
+
+    counts = count_notifications([user_id])[user_id]
+    # add() so a counter incremented meanwhile is not overwritten with an older value
+    for name, key in keys.items():
+        count_cache.add(key, counts[name])
+    return counts
+
+
+def adjust(user_id, total=0, unread=0):
+    """Apply a change to a user's counters once the current transaction commits"""
+    def apply():
+        for name, delta in (('total', total), ('unread', unread)):
+            if delta:
+                try:
+                    count_cache.incr(counter_key(user_id, name), delta)
+                except ValueError:
+                    # Not cached: computed on the next read
+                    pass
+
+    if total or unread:
+        transaction.on_commit(apply)
+
+
+def notifications_created(notifications):
+    """Count new notifications towards their recipients' counters"""
+    created = Counter(notification.recipient_id for notification in notifications)
+    unread = Counter(notification.recipient_id for notification in notifications if not notification.is_read)
+    for user_id, count in created.items():
+        adjust(user_id, total=count, unread=unread[user_id])
+
+
+def reconcile_counts(batch_size=None):
+    """Recount every user with cached counters in batches and fix the ones that drifted; returns how many"""
+    from accounts.models import CustomUser
+
+    batch_size = batch_size or settings.NOTIFICATION_COUNTER_RECONCILE_BATCH_SIZE
+    corrected = 0
+    last_id = 0
+
+    while True:
+        user_ids = list(
+            CustomUser.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+
+        keys = {counter_key(user_id, name): (user_id, name) for user_id in user_ids for name in ('total', 'unread')}
+        cached = count_cache.get_many(keys)
+        if not cached:
+            continue
+
+        counts = count_notifications(sorted({keys[key][0] for key in cached}))
+        fixes = {}
+        for key, value in cached.items():
+            user_id, name = keys[key]
+            if value != counts[user_id][name]:
+                fixes[key] = counts[user_id][name]
+        if fixes:
+            count_cache.set_many(fixes)
+            corrected += len(fixes)
+
+    return corrected
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from notifications.retention import archive_notifications
+
+
+class Command(BaseCommand):
+    help = "Move notifications past their retention period to the archive table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        archived = archive_notifications(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} notification(s)"))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:51
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='payload_version',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
@@ -38,8 +39,16 @@ class Notification(models.Model):
 
     sent_time = models.DateTimeField(null=True, blank=True)
     read_at = models.DateTimeField(null=True, blank=True)
-    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='sent')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     extra_data = models.JSONField(default=dict, blank=True)
+    # Snapshot of the content object's render payload (see notifications.payloads); version 0 means none
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    payload_version = models.PositiveSmallIntegerField(default=0)
+
+    # Delivery outbox (see notifications.outbox): pending rows are picked up once next_attempt_at has passed
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
 
     class Meta:
         ordering = ['-created_time']
@@ -47,21 +56,85 @@ class Notification(models.Model):
             models.Index(fields=['recipient', 'read_at']),
             models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['notification_type']),
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_outbox_idx'),
+            models.Index(fields=['created_time'], name='notification_created_idx'),
+            models.Index(fields=['recipient', '-id'], name='notification_recipient_id_idx'),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.recipient.email}"
 
+    # Recipient's read watermark: annotated by notifications.read_state.with_read_state(), otherwise looked up once
+    read_up_to = None
+
     def mark_as_read(self):
-        if not self.read_at:
+        if not self.is_read:
             self.read_at = timezone.now()
             self.save(update_fields=['read_at'])
 
+            from .counters import adjust
+            from .pubsub import publish_read
+            adjust(self.recipient_id, unread=-1)
+            # Streams only counted it if it was delivered
+            if self.status == 'sent':
+                publish_read(self.recipient_id, 1)
+
     @property
     def is_read(self):
-        return self.read_at is not None
+        """Read explicitly, or covered by the recipient's "read up to" watermark"""
+        if self.read_at is not None:
+            return True
+        if self.pk is None:
+            return False
+        if self.read_up_to is None:
+            from .read_state import get_watermark
+            self.read_up_to = get_watermark(self.recipient_id)
+        return self.pk <= self.read_up_to
 
     def get_instance_id(self):
         if self.content_object:
             return self.content_object.id
         return None
+
+
+class NotificationReadState(models.Model):
+    """
+    A user's "read up to" watermark: every notification with an id up to
+    read_up_to_id counts as read, so marking everything read is one UPDATE of
+    this row. Notification.read_at is only set for reads out of order.
+    """
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='notification_read_state'
+    )
+    read_up_to_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.read_up_to_id}"
+
+
+class ArchivedNotification(models.Model):
+    """
+    Notifications moved out of the live table by the retention archiver
+    (notifications.retention). Keeps the original id and only what is needed
+    to show them again; the payload snapshot replaces the live content object.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_notifications')
+    notification_type = models.CharField(max_length=30)
+    title = models.CharField(max_length=200)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.IntegerField()
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    created_time = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['recipient', '-id'], name='archived_notification_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.recipient_id}"
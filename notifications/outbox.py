@@ -0,0 +1,129 @@
+"""
+Transactional outbox for notification delivery.
+
+NotificationService writes notifications as `pending` rows in the caller's
+transaction. After commit a Celery task drains them in batches: each batch is
+handed to every channel in NOTIFICATION_CHANNELS, then marked `sent`; failing
+rows are retried with exponential backoff and marked `failed` after
+NOTIFICATION_MAX_ATTEMPTS attempts.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from config.cache import lock_cache
+from .models import Notification
+from .read_state import with_read_state
+
+logger = logging.getLogger(__name__)
+
+DRAIN_SCHEDULED_KEY = 'notification_outbox_drain_scheduled'
+
+
+def get_channels():
+    """Delivery channels: callables taking a list of notifications, raising on failure"""
+    return [import_string(path) for path in settings.NOTIFICATION_CHANNELS]
+
+
+def schedule_drain():
+    """Drain the outbox once the current transaction commits (at most one task per second)"""
+    def enqueue():
+        from .tasks import deliver_notifications_task
+
+        try:
+            if lock_cache.add(DRAIN_SCHEDULED_KEY, True, 1):
+                deliver_notifications_task.delay()
+        except Exception as exc:
+            # The periodic drain (CELERY_BEAT_SCHEDULE) picks the rows up; never fail the caller's request
+            logger.warning(f"Could not schedule notification delivery: {exc!r}")
+
+    transaction.on_commit(enqueue)
+
+
+def retry_delay(attempts):
+    delay = settings.NOTIFICATION_RETRY_BASE_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.NOTIFICATION_RETRY_MAX_DELAY))
+
+
+def claim_batch(batch_size, now=None):
+    """
+    Lease up to batch_size due notifications to this worker: they are pushed
+    NOTIFICATION_DELIVERY_LEASE seconds into the future, so a crashed worker's
+    batch is picked up again once the lease runs out.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        Notification.objects.filter(pk__in=ids).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.NOTIFICATION_DELIVERY_LEASE)
+        )
+    return list(with_read_state(Notification.objects.filter(pk__in=ids)).select_related('recipient').order_by('pk'))
+
+
+def deliver(notifications, channels):
+    """Deliver a batch; returns {notification id: error} for the ones that failed"""
+    try:
+        for channel in channels:
+            channel(notifications)
+        return {}
+    except Exception as exc:
+        if len(notifications) == 1:
+            logger.warning(f"Notification {notifications[0].pk} delivery failed: {exc!r}")
+            return {notifications[0].pk: repr(exc)}
+
+    # Retry one by one so a single bad row doesn't fail the whole batch
+    errors = {}
+    for notification in notifications:
+        errors.update(deliver([notification], channels))
+    return errors
+
+
+def drain_outbox(batch_size=None, max_batches=None):
+    """Deliver due pending notifications batch by batch; returns (sent, failed) counts"""
+    batch_size = batch_size or settings.NOTIFICATION_DELIVERY_BATCH_SIZE
+    channels = get_channels()
+    if not channels:
+        # Nothing could deliver them: leave the rows pending instead of marking them sent
+        logger.warning("NOTIFICATION_CHANNELS is empty, notifications stay pending")
+        return 0, 0
+    sent = failed = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        notifications = claim_batch(batch_size)
+        if not notifications:
+            break
+        batches += 1
+
+        errors = deliver(notifications, channels)
+        now = timezone.now()
+
+        delivered = [notification.pk for notification in notifications if notification.pk not in errors]
+        Notification.objects.filter(pk__in=delivered).update(
+            status='sent', sent_time=now, next_attempt_at=None, last_error=''
+        )
+        sent += len(delivered)
+
+        for notification in notifications:
+            if notification.pk not in errors:
+                continue
+            if notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+                updates = {'status': 'failed', 'next_attempt_at': None}
+                failed += 1
+            else:
+                updates = {'next_attempt_at': now + retry_delay(notification.attempts)}
+            Notification.objects.filter(pk=notification.pk).update(last_error=errors[notification.pk], **updates)
+
+    if sent or failed:
+        logger.info(f"Notification outbox: {sent} sent, {failed} failed")
+    return sent, failed
@@ -0,0 +1,40 @@
+"""
+Render payloads of notification content objects.
+
+NotificationService snapshots the payload on the notification when it is
+created (Notification.payload, tagged with payload_version), so reading a
+notification needs no joins. Bump PAYLOAD_VERSION whenever the payload
+changes shape; rows with an older version are rendered from the live objects.
+"""
+PAYLOAD_VERSION = 1
+
+
+def content_object_payload(content_object):
+    if content_object is None:
+        return None
+
+    if content_object._meta.label_lower == 'applications.application':
+        return {
+            'id': content_object.id,
+            'reward_name': content_object.reward.name,
+            'status': content_object.status,
+            'status_display': content_object.get_status_display(),
+            'area': content_object.get_area_display(),
+            'district': content_object.district,
+            'activity': content_object.activity,
+            'created_at': content_object.created_at,
+        }
+
+    return {
+        'id': content_object.id,
+        'model': content_object._meta.model_name
+    }
+
+
+def is_live(request):
+    """?live=true renders payloads from the current state of the content objects"""
+    return request is not None and request.query_params.get('live', '').lower() == 'true'
+
+
+def needs_live_payload(notification, live=False):
+    return live or notification.payload_version != PAYLOAD_VERSION
@@ -0,0 +1,157 @@
+"""
+Pub/sub for the notification stream (notifications/stream.py).
+
+Events are dicts published per user: a delivered notification
+({'type': 'notification', 'notification': {...}, 'unread_delta': 1}),
+notifications being read ({'type': 'read', 'unread_delta': -n}) or a new
+unread count ({'type': 'unread_count', 'unread_count': n}).
+
+LocalBroker fans events out to the stream connections of the current process.
+RedisBroker publishes through a Redis channel instead, so that events raised
+in a Celery worker or another server process reach every connection.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = 'notifications:events'
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class LocalBroker:
+    """Per-process subscribers: one asyncio queue per stream connection"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Must be called from the event loop that will read the queue"""
+        queue = asyncio.Queue(settings.NOTIFICATION_STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({item for item in subscribers if item[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, user_id, event):
+        self.dispatch(user_id, event)
+
+    def dispatch(self, user_id, event):
+        """Hand an event to this process' connections of user_id; safe to call from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put, queue, event)
+            except RuntimeError:
+                # The connection's event loop is gone
+                self.unsubscribe(user_id, queue)
+
+
+class RedisBroker(LocalBroker):
+    """Publishes to a Redis channel; a listener thread per process dispatches to local connections"""
+
+    def __init__(self, url=None):
+        super().__init__()
+        import redis
+
+        self.client = redis.Redis.from_url(url or settings.NOTIFICATION_PUBSUB_URL)
+        self._listener = None
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id, event):
+        self.client.publish(REDIS_CHANNEL, json.dumps({'user_id': user_id, 'event': event}))
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='notification-pubsub', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIS_CHANNEL)
+                for message in pubsub.listen():
+                    data = json.loads(message['data'])
+                    self.dispatch(data['user_id'], data['event'])
+            except Exception as exc:
+                logger.warning(f"Notification pub/sub listener reconnecting: {exc!r}")
+                time.sleep(1)
+
+
+def _put(queue, event):
+    if queue.full():
+        # A client this far behind is told to reload instead of getting a partial stream
+        while not queue.empty():
+            queue.get_nowait()
+        event = {'type': 'resync'}
+    queue.put_nowait(event)
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.NOTIFICATION_PUBSUB_BACKEND)()
+        return _broker
+
+
+def publish_notifications(notifications):
+    """Outbox channel (see NOTIFICATION_CHANNELS): push delivered notifications to their recipients' streams"""
+    from .serializers import NotificationListSerializer
+
+    broker = get_broker()
+    for notification in notifications:
+        broker.publish(notification.recipient_id, {
+            'type': 'notification',
+            'notification': NotificationListSerializer(notification).data,
+            'unread_delta': 0 if notification.is_read else 1,
+        })
+
+
+def publish_after_commit(user_id, event):
+    def publish():
+        try:
+            get_broker().publish(user_id, event)
+        except Exception as exc:
+            # Streams resync their count on reconnect; a lost event must not fail the request
+            logger.warning(f"Could not publish {event['type']} event for user {user_id}: {exc!r}")
+
+    transaction.on_commit(publish)
+
+
+def publish_read(user_id, count):
+    """Tell the user's streams that count delivered notifications were read, once the transaction commits"""
+    if count:
+        publish_after_commit(user_id, {'type': 'read', 'unread_delta': -count})
+
+
+def publish_unread_count(user_id, count):
+    """Reset the unread count of the user's streams, e.g. after everything was marked read"""
+    publish_after_commit(user_id, {'type': 'unread_count', 'unread_count': count})
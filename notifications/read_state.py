@@ -0,0 +1,57 @@
+"""
+Read state of notifications: a notification is read if it has read_at set
+(read on its own) or its id is covered by the recipient's watermark
+(NotificationReadState.read_up_to_id, moved by "mark all as read").
+"""
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Notification, NotificationReadState
+from .pubsub import publish_unread_count
+
+
+def watermark():
+    """The recipient's watermark as a subquery on NotificationReadState's primary key (0 without a row)"""
+    return Coalesce(
+        Subquery(NotificationReadState.objects.filter(user_id=OuterRef('recipient_id')).values('read_up_to_id')[:1]),
+        Value(0)
+    )
+
+
+def unread_q():
+    return Q(read_at__isnull=True, pk__gt=watermark())
+
+
+def read_q():
+    return Q(read_at__isnull=False) | Q(pk__lte=watermark())
+
+
+def with_read_state(queryset):
+    """Annotate the watermark so Notification.is_read needs no extra query"""
+    return queryset.annotate(read_up_to=watermark())
+
+
+def get_watermark(user_id):
+    return NotificationReadState.objects.filter(user_id=user_id).values_list('read_up_to_id', flat=True).first() or 0
+
+
+def mark_all_read(user):
+    """
+    Move the user's watermark to their newest notification: one indexed
+    lookup and one UPDATE, however long the history. Returns how many
+    notifications were unread.
+    """
+    from .counters import adjust, get_counts
+
+    last_id = Notification.objects.filter(recipient=user).order_by('-pk').values_list('pk', flat=True).first()
+    if last_id is None:
+        return 0
+
+    unread_before = get_counts(user.pk)['unread']
+    moved = NotificationReadState.objects.filter(user=user, read_up_to_id__lt=last_id).update(read_up_to_id=last_id)
+    if not moved:
+        NotificationReadState.objects.get_or_create(user=user, defaults={'read_up_to_id': last_id})
+
+    adjust(user.pk, unread=-unread_before)
+    publish_unread_count(user.pk, 0)
+    return unread_before
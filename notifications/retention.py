@@ -0,0 +1,107 @@
+"""
+Notification retention: delivered notifications older than the retention
+period for their read state are moved to ArchivedNotification in batches,
+so the live table only holds recent history.
+
+    NOTIFICATION_RETENTION_READ_DAYS    read notifications
+    NOTIFICATION_RETENTION_UNREAD_DAYS  unread ones (kept longer)
+
+Pending notifications are never archived, they still have to be delivered.
+Rows without a current payload snapshot get one from their content object
+first, since the archive has no other way to render them.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import adjust
+from .models import ArchivedNotification, Notification
+from .payloads import PAYLOAD_VERSION, content_object_payload
+from .read_state import read_q, with_read_state
+from .serializers import resolve_content_objects
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_FIELDS = [
+    'id', 'recipient_id', 'notification_type', 'title', 'content_type_id', 'object_id',
+    'payload', 'created_time', 'read_at',
+]
+
+
+def expired_notifications(now=None):
+    now = now or timezone.now()
+    read_before = now - timedelta(days=settings.NOTIFICATION_RETENTION_READ_DAYS)
+    unread_before = now - timedelta(days=settings.NOTIFICATION_RETENTION_UNREAD_DAYS)
+    return Notification.objects.exclude(status='pending').filter(
+        (read_q() & Q(created_time__lte=read_before)) | Q(created_time__lte=unread_before)
+    )
+
+
+def snapshot_payloads(ids):
+    """{id: payload} built from the live content objects, for notifications created before payload snapshots"""
+    if not ids:
+        return {}
+    notifications = list(Notification.objects.filter(pk__in=ids))
+    resolve_content_objects(notifications)
+    return {
+        notification.pk: content_object_payload(notification.content_object) or {}
+        for notification in notifications
+    }
+
+
+def archive_batch(now, batch_size):
+    """Move one batch to the archive in one transaction; returns how many were moved"""
+    with transaction.atomic():
+        ids = list(
+            expired_notifications(now).select_for_update(skip_locked=True)
+            .order_by('created_time').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        rows = list(
+            with_read_state(Notification.objects.filter(pk__in=ids))
+            .values(*ARCHIVED_FIELDS, 'payload_version', 'read_up_to')
+        )
+        payloads = snapshot_payloads([row['id'] for row in rows if row.pop('payload_version') != PAYLOAD_VERSION])
+        for row in rows:
+            if row['id'] in payloads:
+                row['payload'] = payloads[row['id']]
+            # Notifications read through the watermark keep being read in the archive
+            if row.pop('read_up_to') >= row['id'] and row['read_at'] is None:
+                row['read_at'] = now
+        ArchivedNotification.objects.bulk_create(
+            [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+        )
+        Notification.objects.filter(pk__in=ids).delete()
+
+        total = Counter()
+        unread = Counter()
+        for row in rows:
+            total[row['recipient_id']] += 1
+            if row['read_at'] is None:
+                unread[row['recipient_id']] += 1
+        for user_id, count in total.items():
+            adjust(user_id, total=-count, unread=-unread[user_id])
+    return len(ids)
+
+
+def archive_notifications(now=None, batch_size=None):
+    """Archive every expired notification, batch by batch; returns how many were archived"""
+    now = now or timezone.now()
+    batch_size = batch_size or settings.NOTIFICATION_ARCHIVE_BATCH_SIZE
+    archived = 0
+
+    while True:
+        moved = archive_batch(now, batch_size)
+        if not moved:
+            break
+        archived += moved
+
+    logger.info(f"Notification retention: archived {archived} notifications")
+    return archived
@@ -1,9 +1,72 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from django.contrib.contenttypes.models import ContentType
-from .models import Notification
+from .models import ArchivedNotification, Notification
+from .payloads import content_object_payload, is_live, needs_live_payload
+
+# Relations read by content_object_payload, loaded with each content type's objects
+CONTENT_OBJECT_RELATED = {
+    'applications.application': ['reward'],
+}
+
+
+def resolve_content_objects(notifications):
+    """
+    Attach content objects (and content types) to notifications with one
+    query per content type, instead of one or more queries per notification.
+    Objects that no longer exist are attached as None.
+    """
+    content_object_field = Notification._meta.get_field('content_object')
+    content_type_field = Notification._meta.get_field('content_type')
+
+    object_ids = defaultdict(set)
+    for notification in notifications:
+        if not content_object_field.is_cached(notification):
+            object_ids[notification.content_type_id].add(notification.object_id)
+
+    objects = {}
+    for content_type_id, ids in object_ids.items():
+        content_type = ContentType.objects.get_for_id(content_type_id)
+        model = content_type.model_class()
+        queryset = model._base_manager.filter(pk__in=ids)
+        related = CONTENT_OBJECT_RELATED.get(model._meta.label_lower)
+        if related:
+            queryset = queryset.select_related(*related)
+        objects.update({(content_type_id, obj.pk): obj for obj in queryset})
+
+    for notification in notifications:
+        if not content_type_field.is_cached(notification):
+            content_type_field.set_cached_value(notification, ContentType.objects.get_for_id(notification.content_type_id))
+        if not content_object_field.is_cached(notification):
+            content_object_field.set_cached_value(
+                notification, objects.get((notification.content_type_id, notification.object_id))
+            )
+    return notifications
+
+
+class ContentObjectListSerializer(serializers.ListSerializer):
+    """Resolves the content objects of a whole page before serializing it, where snapshots can't be used"""
+
+    def to_representation(self, data):
+        notifications = list(data.all() if hasattr(data, 'all') else data)
+        live = is_live(self.context.get('request'))
+        resolve_content_objects([
+            notification for notification in notifications if needs_live_payload(notification, live)
+        ])
+        return super().to_representation(notifications)
+
+
+class ContentObjectDataMixin:
+    """content_object_data from the notification's payload snapshot, or from the live object with ?live=true"""
+
+    def get_content_object_data(self, obj):
+        if not needs_live_payload(obj, is_live(self.context.get('request'))):
+            return obj.payload
+        return content_object_payload(obj.content_object)
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(ContentObjectDataMixin, serializers.ModelSerializer):
     """Main notification serializer"""
 
     content_object_data = serializers.SerializerMethodField()
@@ -20,30 +83,7 @@ class NotificationSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'id', 'created_time', 'sent_time', 'status', 'content_object_data'
         ]
-
-    def get_content_object_data(self, obj):
-        """Get related object data based on content type"""
-        if not obj.content_object:
-            return None
-
-        # Handle different content types
-        if obj.content_type.model == 'application':
-            from applications.serializers import ApplicationDetailSerializer
-            return {
-                'id': obj.content_object.id,
-                'reward_name': obj.content_object.reward.name,
-                'status': obj.content_object.status,
-                'status_display': obj.content_object.get_status_display(),
-                'area': obj.content_object.get_area_display(),
-                'district': obj.content_object.district,
-                'activity': obj.content_object.activity,
-                'created_at': obj.content_object.created_at,
-            }
-
-        return {
-            'id': obj.content_object.id,
-            'model': obj.content_type.model
-        }
+        list_serializer_class = ContentObjectListSerializer
 
     def get_time_since(self, obj):
         """Get human readable time since creation"""
@@ -51,24 +91,43 @@ class NotificationSerializer(serializers.ModelSerializer):
         return timesince(obj.created_time)
 
 
-class NotificationListSerializer(serializers.ModelSerializer):
+class NotificationListSerializer(ContentObjectDataMixin, serializers.ModelSerializer):
     """Lightweight serializer for notification list"""
 
     is_read = serializers.ReadOnlyField()
     time_since = serializers.SerializerMethodField()
+    content_object_data = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
         fields = [
             'id', 'title', 'notification_type',
-            'created_time', 'is_read', 'time_since'
+            'created_time', 'is_read', 'time_since', 'content_object_data'
         ]
+        list_serializer_class = ContentObjectListSerializer
 
     def get_time_since(self, obj):
         from django.utils.timesince import timesince
         return timesince(obj.created_time)
 
 
+class ArchivedNotificationSerializer(serializers.ModelSerializer):
+    """Archived notifications, rendered from their payload snapshot"""
+
+    is_read = serializers.SerializerMethodField()
+    content_object_data = serializers.JSONField(source='payload')
+
+    class Meta:
+        model = ArchivedNotification
+        fields = [
+            'id', 'title', 'notification_type',
+            'created_time', 'read_at', 'is_read', 'archived_at', 'content_object_data'
+        ]
+
+    def get_is_read(self, obj):
+        return obj.read_at is not None
+
+
 class MarkAsReadSerializer(serializers.Serializer):
     """Serializer for marking notifications as read"""
 
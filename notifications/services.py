@@ -1,6 +1,34 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+
+from applications.models import Reward
+from .counters import notifications_created
 from .models import Notification
+from .outbox import schedule_drain
+from .payloads import PAYLOAD_VERSION, content_object_payload
+
+_buffer = ContextVar('notification_buffer', default=None)
+
+
+class NotificationBuffer:
+    """Notifications collected by NotificationService.buffered(), written with bulk_create"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.notifications = []
+        self.rewards = {}
+
+    def add(self, notification):
+        self.notifications.append(notification)
+        if len(self.notifications) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        NotificationService.create_many(self.notifications, batch_size=self.batch_size)
+        self.notifications = []
 
 
 class NotificationService:
@@ -12,47 +40,119 @@ class NotificationService:
             content_object,
             notification_type,
             title,
-            extra_data=None
+            extra_data=None,
+            commit=True
     ):
-        """Create a new notification"""
+        """
+        Create a new notification for recipient (a user or a user id).
+        It is saved as `pending` and delivered by the outbox worker after commit,
+        with a snapshot of content_object's render payload.
+        With commit=False it is returned unsaved; inside buffered() it is
+        saved when the buffer is flushed.
+        """
+        # get_for_model is served from ContentType's own cache after the first call
         content_type = ContentType.objects.get_for_model(content_object)
 
-        notification = Notification.objects.create(
-            recipient=recipient,
+        notification = Notification(
+            recipient_id=getattr(recipient, 'pk', recipient),
             content_type=content_type,
             object_id=content_object.id,
             notification_type=notification_type,
             title=title,
-            status='sent',
-            sent_time=timezone.now(),
-            extra_data=extra_data or {}
+            status='pending',
+            next_attempt_at=timezone.now(),
+            extra_data=extra_data or {},
+            payload=content_object_payload(content_object),
+            payload_version=PAYLOAD_VERSION
         )
-
+        # A new row is newer than any watermark
+        notification.read_up_to = 0
+
+        if commit:
+            buffer = _buffer.get()
+            if buffer is not None:
+                buffer.add(notification)
+            else:
+                notification.save()
+                notifications_created([notification])
+                schedule_drain()
         return notification
 
     @staticmethod
-    def create_application_created_notification(application):
+    def create_many(notifications, batch_size=1000):
+        """Save notifications built with commit=False using bulk_create"""
+        notifications = Notification.objects.bulk_create(notifications, batch_size=batch_size)
+        if notifications:
+            notifications_created(notifications)
+            schedule_drain()
+        return notifications
+
+    @staticmethod
+    @contextmanager
+    def buffered(batch_size=1000):
+        """
+        Collect every notification created inside the block and save them with
+        bulk_create, every batch_size notifications and on exit:
+
+            with NotificationService.buffered():
+                for application in applications:
+                    NotificationService.create_application_won_notification(application)
+
+        Rewards are also loaded once per reward instead of once per application.
+        Nested blocks share the outer buffer. If the block raises, unsaved
+        notifications are discarded.
+        """
+        if _buffer.get() is not None:
+            yield _buffer.get()
+            return
+
+        buffer = NotificationBuffer(batch_size)
+        token = _buffer.set(buffer)
+        try:
+            yield buffer
+            buffer.flush()
+        finally:
+            _buffer.reset(token)
+
+    @staticmethod
+    def get_reward(application):
+        """application.reward, loaded once per buffered() block when it is not preloaded"""
+        buffer = _buffer.get()
+        if buffer is None or application._meta.get_field('reward').is_cached(application):
+            return application.reward
+
+        reward = buffer.rewards.get(application.reward_id)
+        if reward is None:
+            reward = buffer.rewards[application.reward_id] = Reward.objects.get(pk=application.reward_id)
+        application._meta.get_field('reward').set_cached_value(application, reward)
+        return reward
+
+    @staticmethod
+    def create_application_created_notification(application, commit=True):
         """Create notification when application is created"""
-        title = f"Sizning '{application.reward.name}' mukofoti uchun arizangiz muvaffaqiyatli yuborildi."
+        reward = NotificationService.get_reward(application)
+        title = f"Sizning '{reward.name}' mukofoti uchun arizangiz muvaffaqiyatli yuborildi."
 
         extra_data = {
-            'reward_name': application.reward.name,
+            'reward_name': reward.name,
             'area': application.get_area_display(),
             'district': application.district,
             'activity': application.activity
         }
 
         return NotificationService.create_notification(
-            recipient=application.user,
+            recipient=application.user_id,
             content_object=application,
             notification_type='application_created',
             title=title,
-            extra_data=extra_data
+            extra_data=extra_data,
+            commit=commit
         )
 
     @staticmethod
-    def create_application_in_process_notification(application, old_status):
+    def create_application_in_process_notification(application, old_status, commit=True):
         """Create notification when application is in process (mahalla, tuman, hudud)"""
+        reward = NotificationService.get_reward(application)
         status_messages = {
             'mahalla': 'Arizangiz mahalla bosqichida ko\'rib chiqilmoqda',
             'tuman': 'Arizangiz tuman bosqichida ko\'rib chiqilmoqda',
@@ -62,75 +162,82 @@ class NotificationService:
         title = f"Arizangiz ko'rib chiqilmoqda,  Arizangiz {application.get_status_display()} bosqichida."
 
         extra_data = {
-            'reward_name': application.reward.name,
+            'reward_name': reward.name,
             'old_status': old_status,
             'new_status': application.status,
             'status_display': application.get_status_display()
         }
 
         return NotificationService.create_notification(
-            recipient=application.user,
+            recipient=application.user_id,
             content_object=application,
             notification_type='application_updated',
             title=title,
-            extra_data=extra_data
+            extra_data=extra_data,
+            commit=commit
         )
 
     @staticmethod
-    def create_application_last_process_notification(application):
+    def create_application_last_process_notification(application, commit=True):
         """Create notification when application is in process oxirgi_tasdiqlash"""
+        reward = NotificationService.get_reward(application)
 
         title = "Ariza holati yangilandi"
         extra_data = {
-            'reward_name': application.reward.name,
+            'reward_name': reward.name,
             'updated_date': timezone.now().isoformat()
         }
 
         return NotificationService.create_notification(
-            recipient=application.user,
+            recipient=application.user_id,
             content_object=application,
             notification_type='application_updated',
             title=title,
-            extra_data=extra_data
+            extra_data=extra_data,
+            commit=commit
         )
 
 
     @staticmethod
-    def create_application_won_notification(application):
+    def create_application_won_notification(application, commit=True):
         """Create notification when application is approved (mukofotlangan)"""
+        reward = NotificationService.get_reward(application)
         title = (
-            f"Tabriklaymiz! Sizning {application.reward.name}' mukofoti uchun arizangiz barcha bosqichlardan muvaffaqiyatli o‘tdi va yakuniy qaror bilan ushbu mukofotga loyiq deb topildingiz.")
+            f"Tabriklaymiz! Sizning {reward.name}' mukofoti uchun arizangiz barcha bosqichlardan muvaffaqiyatli o‘tdi va yakuniy qaror bilan ushbu mukofotga loyiq deb topildingiz.")
 
         extra_data = {
-            'reward_name': application.reward.name,
-            'reward_description': application.reward.description,
+            'reward_name': reward.name,
+            'reward_description': reward.description,
             'won_date': timezone.now().isoformat()
         }
 
         return NotificationService.create_notification(
-            recipient=application.user,
+            recipient=application.user_id,
             content_object=application,
             notification_type='reward_won',
             title=title,
-            extra_data=extra_data
+            extra_data=extra_data,
+            commit=commit
         )
 
     @staticmethod
-    def create_application_rejected_notification(application):
+    def create_application_rejected_notification(application, commit=True):
         """Create notification when application is rejected (rad_etilgan)"""
-        title = f"Afsuski, '{application.reward.name}' mukofoti uchun arizangiz rad etildi."
-        # description = f"Afsuski, '{application.reward.name}' mukofoti uchun arizangiz rad etildi."
-        # message = f"Hurmatli {application.user.get_full_name()}, sizning '{application.reward.name}' mukofoti uchun arizangiz rad etildi. Boshqa imkoniyatlar uchun kuzatib boring."
+        reward = NotificationService.get_reward(application)
+        title = f"Afsuski, '{reward.name}' mukofoti uchun arizangiz rad etildi."
+        # description = f"Afsuski, '{reward.name}' mukofoti uchun arizangiz rad etildi."
+        # message = f"Hurmatli {application.user.get_full_name()}, sizning '{reward.name}' mukofoti uchun arizangiz rad etildi. Boshqa imkoniyatlar uchun kuzatib boring."
 
         extra_data = {
-            'reward_name': application.reward.name,
+            'reward_name': reward.name,
             'rejected_date': timezone.now().isoformat()
         }
 
         return NotificationService.create_notification(
-            recipient=application.user,
+            recipient=application.user_id,
             content_object=application,
             notification_type='application_rejected',
             title=title,
-            extra_data=extra_data
+            extra_data=extra_data,
+            commit=commit
         )
@@ -0,0 +1,77 @@
+"""
+Server-Sent Events stream of a user's notifications, served by the ASGI app.
+
+    GET /notifications/stream/?token=<access token>
+
+On connect it sends the unread count once (`event: unread_count`), then
+pushes `notification` and `read` events carrying an `unread_delta`, so
+clients keep their badge up to date without polling; an `unread_count`
+event replaces the count (after "mark all as read"). A `resync` event means
+the client fell behind and should reload its list.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .models import Notification
+from .pubsub import get_broker
+from .read_state import unread_q
+
+
+def get_user(request):
+    """EventSource cannot send headers, so the access token may also come as ?token="""
+    authentication = JWTAuthentication()
+    try:
+        raw_token = request.GET.get('token')
+        if raw_token:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        result = authentication.authenticate(request)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+def unread_count(user_id):
+    """Delivered unread notifications; pending ones are counted as their events arrive"""
+    return Notification.objects.filter(unread_q(), recipient_id=user_id, status='sent').count()
+
+
+def format_event(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(user_id):
+    broker = get_broker()
+    # Subscribe before counting so nothing published in between is lost
+    queue = broker.subscribe(user_id)
+    try:
+        yield f"retry: {settings.NOTIFICATION_STREAM_RETRY * 1000}\n\n"
+        yield format_event('unread_count', {'unread_count': await sync_to_async(unread_count)(user_id)})
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.NOTIFICATION_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(event['type'], event)
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+@require_GET
+async def notification_stream(request):
+    user = await sync_to_async(get_user)(request)
+    if user is None:
+        return JsonResponse({'detail': "Avtorizatsiya talab qilinadi"}, status=401)
+
+    response = StreamingHttpResponse(event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,24 @@
+from celery import shared_task
+
+from .counters import reconcile_counts
+from .outbox import drain_outbox
+from .retention import archive_notifications
+
+
+@shared_task
+def deliver_notifications_task():
+    """Drain the notification outbox (scheduled after commit and by CELERY_BEAT_SCHEDULE for retries)"""
+    sent, failed = drain_outbox()
+    return {'sent': sent, 'failed': failed}
+
+
+@shared_task
+def reconcile_notification_counts_task():
+    """Correct cached notification counters that drifted from the database"""
+    return reconcile_counts()
+
+
+@shared_task
+def archive_notifications_task():
+    """Move notifications past their retention period to the archive (CELERY_BEAT_SCHEDULE)"""
+    return archive_notifications()
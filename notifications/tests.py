@@ -1,3 +1,553 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from applications.models import Application, Reward
+from config.cache import count_cache, lock_cache
+from .counters import get_counts, reconcile_counts
+from .models import ArchivedNotification, Notification, NotificationReadState
+from .payloads import PAYLOAD_VERSION
+from .read_state import with_read_state
+from .retention import archive_notifications
+from .serializers import NotificationSerializer
+from .outbox import DRAIN_SCHEDULED_KEY, drain_outbox
+from .pubsub import get_broker, publish_notifications
+from .services import NotificationService
+from .stream import event_stream
+from .tasks import deliver_notifications_task
+
+CustomUser = get_user_model()
+
+
+class NotificationTestMixin:
+
+    def create_user(self, index):
+        return CustomUser.objects.create_user(
+            email=f'user{index}@example.com',
+            phone_number=f'+99890000{index:04d}',
+            first_name=f'Ism{index}',
+            last_name=f'Familiya{index}',
+        )
+
+    def create_applications(self, count, reward):
+        start = CustomUser.objects.count()
+        return [
+            Application.objects.create(
+                user=self.create_user(index), reward=reward, area='Toshkent', district='Chilonzor',
+                neighborhood='Mahalla', activity='Faoliyat', activity_description='Tavsif'
+            )
+            for index in range(start, start + count)
+        ]
+
+
+class BufferedNotificationTests(NotificationTestMixin, TestCase):
+
+    def setUp(self):
+        self.rewards = [
+            Reward.objects.create(name=f'Mukofot {i}', description='Tavsif', image='rewards/test.png')
+            for i in range(2)
+        ]
+        for reward in self.rewards:
+            self.create_applications(10, reward)
+        Notification.objects.all().delete()
+
+    def test_buffered_notifications_use_a_handful_of_queries(self):
+        # Neither user nor reward preloaded
+        applications = list(Application.objects.all())
+
+        # One query per distinct reward and one bulk INSERT
+        with self.assertNumQueries(3):
+            with NotificationService.buffered():
+                for application in applications:
+                    NotificationService.create_application_won_notification(application)
+
+        self.assertEqual(Notification.objects.filter(notification_type='reward_won').count(), 20)
+        self.assertEqual(
+            set(Notification.objects.values_list('recipient_id', flat=True)),
+            {application.user_id for application in applications}
+        )
+
+    def test_buffer_flushes_in_batches_and_discards_on_error(self):
+        applications = list(Application.objects.select_related('reward'))
+
+        with self.assertRaises(RuntimeError):
+            with NotificationService.buffered(batch_size=15):
+                for application in applications:
+                    NotificationService.create_application_rejected_notification(application)
+                raise RuntimeError
+
+        # The first full batch was written, the remainder was dropped
+        self.assertEqual(Notification.objects.count(), 15)
+
+    def test_create_many(self):
+        application = Application.objects.select_related('reward').first()
+        notifications = [
+            NotificationService.create_application_won_notification(application, commit=False)
+            for _ in range(3)
+        ]
+        with self.assertNumQueries(1):
+            NotificationService.create_many(notifications)
+        self.assertEqual(Notification.objects.count(), 3)
+
+
+delivered = []
+
+
+def record_channel(notifications):
+    delivered.extend(notification.pk for notification in notifications)
+
+
+def failing_channel(notifications):
+    if any(notification.title == 'broken' for notification in notifications):
+        raise ConnectionError('channel down')
+
+
+class OutboxTests(NotificationTestMixin, TestCase):
+
+    def setUp(self):
+        delivered.clear()
+        reward = Reward.objects.create(name='Mukofot', description='Tavsif', image='rewards/test.png')
+        self.applications = self.create_applications(3, reward)
+
+    def test_notifications_are_pending_until_delivered(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            NotificationService.create_application_won_notification(self.applications[0])
+        # Counter update and outbox drain
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(Notification.objects.filter(status='pending').count(), 4)
+
+        with override_settings(NOTIFICATION_CHANNELS=['notifications.tests.record_channel']):
+            self.assertEqual(drain_outbox(batch_size=3), (4, 0))
+
+        self.assertEqual(sorted(delivered), sorted(Notification.objects.values_list('pk', flat=True)))
+        self.assertFalse(Notification.objects.exclude(status='sent').exists())
+        self.assertFalse(Notification.objects.filter(sent_time__isnull=True).exists())
+
+    @override_settings(NOTIFICATION_CHANNELS=[])
+    def test_rows_stay_pending_without_channels(self):
+        self.assertEqual(drain_outbox(), (0, 0))
+        self.assertEqual(Notification.objects.filter(status='pending', attempts=0).count(), 3)
+
+    def test_unreachable_broker_does_not_fail_the_commit(self):
+        lock_cache.clear()
+        broker_down = mock.patch.object(deliver_notifications_task, 'delay', side_effect=OperationalError('down'))
+        with broker_down, self.assertLogs('notifications.outbox', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                NotificationService.create_application_won_notification(self.applications[0])
+        self.assertEqual(Notification.objects.filter(status='pending').count(), 4)
+
+    @override_settings(
+        NOTIFICATION_CHANNELS=['notifications.tests.failing_channel'],
+        NOTIFICATION_MAX_ATTEMPTS=2,
+        NOTIFICATION_RETRY_BASE_DELAY=30
+    )
+    def test_failures_are_retried_with_backoff_then_marked_failed(self):
+        Notification.objects.filter(pk=Notification.objects.first().pk).update(title='broken')
+
+        self.assertEqual(drain_outbox(), (2, 0))
+        broken = Notification.objects.get(title='broken')
+        self.assertEqual((broken.status, broken.attempts), ('pending', 1))
+        self.assertIn('channel down', broken.last_error)
+        self.assertGreater(broken.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+        # Not due yet
+        self.assertEqual(drain_outbox(), (0, 0))
+
+        Notification.objects.filter(pk=broken.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(), (0, 1))
+        self.assertEqual(Notification.objects.get(pk=broken.pk).status, 'failed')
+
+
+class NotificationStreamTests(NotificationTestMixin, TestCase):
+
+    def setUp(self):
+        reward = Reward.objects.create(name='Mukofot', description='Tavsif', image='rewards/test.png')
+        self.applications = self.create_applications(20, reward)
+        self.users = [application.user for application in self.applications]
+        drain_outbox()
+        count_cache.clear()
+
+    async def read_event(self, stream):
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode()
+        event_type, data = chunk.strip().split('\n')
+        return event_type.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    async def test_stream_pushes_new_notifications_and_read_deltas(self):
+        user = self.users[0]
+        response = await self.async_client.get(
+            reverse('notification-stream'), {'token': str(AccessToken.for_user(user))}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertEqual(await self.read_event(stream), ('unread_count', {'unread_count': 1}))
+
+        await sync_to_async(NotificationService.create_application_won_notification)(self.applications[0])
+        await sync_to_async(drain_outbox)()
+        event_type, data = await self.read_event(stream)
+        self.assertEqual((event_type, data['unread_delta']), ('notification', 1))
+        self.assertEqual(data['notification']['notification_type'], 'reward_won')
+
+        notification = await Notification.objects.aget(pk=data['notification']['id'])
+
+        def read():
+            with self.captureOnCommitCallbacks(execute=True):
+                notification.mark_as_read()
+
+        await sync_to_async(read)()
+        self.assertEqual(await self.read_event(stream), ('read', {'type': 'read', 'unread_delta': -1}))
+        await stream.aclose()
+
+    async def test_stream_requires_a_valid_token(self):
+        response = await self.async_client.get(reverse('notification-stream'), {'token': 'invalid'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_load_push_replaces_polling_queries(self):
+        """20 clients following 10 updates: the stream costs one COUNT per connection, like a single poll"""
+        clients, updates = len(self.users), 10
+
+        def poll():
+            client = APIClient()
+            with CaptureQueriesContext(connection) as queries:
+                for user in self.users:
+                    client.force_authenticate(user)
+                    for _ in range(updates):
+                        client.get(reverse('notification-stats'))
+            return len(queries)
+
+        # Only the first poll of each client counts, later ones are served by the cached counters
+        self.assertEqual(await sync_to_async(poll)(), clients)
+
+        def publish(notifications):
+            with CaptureQueriesContext(connection) as queries:
+                publish_notifications(notifications)
+            return len(queries)
+
+        subscribers = get_broker().subscriber_count()
+        streams = [event_stream(user.pk) for user in self.users]
+        queries = CaptureQueriesContext(connection)
+        await sync_to_async(queries.__enter__)()
+        for stream in streams:
+            await anext(stream)
+            await self.read_event(stream)
+        await sync_to_async(queries.__exit__)(None, None, None)
+        # len(queries) would read the log of this thread's connection
+        self.assertEqual(queries.final_queries - queries.initial_queries, clients)
+
+        delivered = await sync_to_async(list)(with_read_state(Notification.objects.all()))
+        for _ in range(updates):
+            self.assertEqual(await sync_to_async(publish)(delivered), 0)
+            for stream in streams:
+                event_type, data = await self.read_event(stream)
+                self.assertEqual((event_type, data['unread_delta']), ('notification', 1))
+
+        for stream in streams:
+            await stream.aclose()
+        self.assertEqual(get_broker().subscriber_count(), subscribers)
+
+
+class NotificationCounterTests(NotificationTestMixin, TestCase):
+
+    def setUp(self):
+        count_cache.clear()
+        # An outbox drain is already scheduled, so committing new notifications does not enqueue one
+        lock_cache.set(DRAIN_SCHEDULED_KEY, True, 60)
+        reward = Reward.objects.create(name='Mukofot', description='Tavsif', image='rewards/test.png')
+        self.applications = self.create_applications(2, reward)
+        self.user = self.applications[0].user
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_counters_follow_creates_and_reads_without_counting(self):
+        self.assertEqual(get_counts(self.user.pk), {'total': 1, 'unread': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.create_application_won_notification(self.applications[0])
+            with NotificationService.buffered():
+                NotificationService.create_application_rejected_notification(self.applications[0])
+                NotificationService.create_application_rejected_notification(self.applications[1])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_counts(self.user.pk), {'total': 3, 'unread': 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.filter(recipient=self.user).first().mark_as_read()
+        self.assertEqual(get_counts(self.user.pk), {'total': 3, 'unread': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notifications-mark-all-read'), {}, format='json')
+
+        # The page only, no COUNTs
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('notification-list'))
+        self.assertEqual(response.data['stats'], {'total_count': 3, 'unread_count': 0, 'read_count': 3})
+
+    def test_pending_and_failed_notifications_are_unread(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                NotificationService.create_application_won_notification(self.applications[0])
+        first, pending, failed, read = Notification.objects.filter(recipient=self.user).order_by('pk')
+        Notification.objects.filter(pk=first.pk).update(status='sent')
+        Notification.objects.filter(pk=failed.pk).update(status='failed')
+        with self.captureOnCommitCallbacks(execute=True):
+            read.mark_as_read()
+
+        expected = {'total_count': 4, 'unread_count': 3, 'read_count': 1}
+        response = self.client.get(reverse('notification-list'))
+        self.assertEqual(response.data['stats'], expected)
+        self.assertEqual(sum(not item['is_read'] for item in response.data['results']), 3)
+        self.assertEqual(self.client.get(reverse('notification-stats')).data, expected)
+
+        count_cache.clear()
+        self.assertEqual(get_counts(self.user.pk), {'total': 4, 'unread': 3})
+
+    def test_reconcile_corrects_drift(self):
+        get_counts(self.user.pk)
+        Notification.objects.filter(recipient=self.user).delete()
+
+        self.assertEqual(reconcile_counts(batch_size=1), 2)
+        self.assertEqual(get_counts(self.user.pk), {'total': 0, 'unread': 0})
+        self.assertEqual(reconcile_counts(), 0)
+
+
+class ContentObjectResolutionTests(NotificationTestMixin, TestCase):
+
+    def setUp(self):
+        rewards = [
+            Reward.objects.create(name=f'Mukofot {i}', description='Tavsif', image='rewards/test.png')
+            for i in range(4)
+        ]
+        for reward in rewards:
+            for application in self.create_applications(5, reward):
+                for _ in range(4):
+                    NotificationService.create_application_won_notification(application)
+        # Rows from before payload snapshots
+        Notification.objects.update(payload={}, payload_version=0)
+
+    def test_page_serializes_in_constant_queries(self):
+        ContentType.objects.get_for_model(Application)
+        self.assertEqual(Notification.objects.count(), 100)
+
+        # The notifications, then the applications with their rewards
+        with self.assertNumQueries(2):
+            data = NotificationSerializer(with_read_state(Notification.objects.all()), many=True).data
+
+        self.assertEqual(len(data), 100)
+        self.assertTrue(all(item['content_object_data']['reward_name'].startswith('Mukofot') for item in data))
+
+    def test_deleted_content_object_is_none(self):
+        application = Application.objects.first()
+        notifications = list(with_read_state(Notification.objects.filter(object_id=application.pk)))
+        Application.objects.filter(pk=application.pk).delete()
+
+        with self.assertNumQueries(1):
+            data = NotificationSerializer(notifications, many=True).data
+        self.assertTrue(all(item['content_object_data'] is None for item in data))
+
+
+class PayloadSnapshotTests(NotificationTestMixin, TestCase):
+
+    def setUp(self):
+        count_cache.clear()
+        reward = Reward.objects.create(name='Mukofot', description='Tavsif', image='rewards/test.png')
+        self.application = self.create_applications(1, reward)[0]
+        self.notification = Notification.objects.get(object_id=self.application.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(self.application.user)
+
+    def test_snapshot_is_served_without_joins(self):
+        self.assertEqual(self.notification.payload_version, PAYLOAD_VERSION)
+        Reward.objects.update(name='Yangi nom')
+        Application.objects.filter(pk=self.application.pk).update(status='tuman')
+
+        # The notification and the read_at UPDATE
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('notification-detail', args=[self.notification.pk]))
+        data = response.data['content_object_data']
+        self.assertEqual((data['reward_name'], data['status']), ('Mukofot', 'yuborilgan'))
+
+        response = self.client.get(reverse('notification-detail', args=[self.notification.pk]), {'live': 'true'})
+        data = response.data['content_object_data']
+        self.assertEqual((data['reward_name'], data['status']), ('Yangi nom', 'tuman'))
+
+    def test_list_serves_snapshots_and_live_on_request(self):
+        get_counts(self.application.user_id)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('notification-list'))
+        self.assertEqual(response.data['results'][0]['content_object_data']['reward_name'], 'Mukofot')
+
+        Reward.objects.update(name='Yangi nom')
+        # The page, then the applications with their rewards
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('notification-list'), {'live': 'true'})
+        self.assertEqual(response.data['results'][0]['content_object_data']['reward_name'], 'Yangi nom')
+
+
+@override_settings(NOTIFICATION_RETENTION_READ_DAYS=30, NOTIFICATION_RETENTION_UNREAD_DAYS=90)
+class RetentionTests(NotificationTestMixin, TestCase):
+
+    def setUp(self):
+        count_cache.clear()
+        reward = Reward.objects.create(name='Mukofot', description='Tavsif', image='rewards/test.png')
+        self.application = self.create_applications(1, reward)[0]
+        self.user = self.application.user
+        Notification.objects.all().delete()
+
+        now = timezone.now()
+        for days, read, status in [
+            (10, True, 'sent'),     # too recent
+            (40, True, 'sent'),     # archived: read and older than 30 days
+            (40, False, 'sent'),    # unread ones are kept for 90 days
+            (100, False, 'sent'),   # archived
+            (100, False, 'failed'),  # archived
+            (100, False, 'pending'),  # not delivered yet
+        ]:
+            notification = NotificationService.create_application_won_notification(self.application)
+            Notification.objects.filter(pk=notification.pk).update(
+                created_time=now - timedelta(days=days),
+                read_at=now if read else None,
+                status=status
+            )
+
+    def test_expired_notifications_are_archived_in_batches(self):
+        self.assertEqual(get_counts(self.user.pk), {'total': 6, 'unread': 4})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_notifications(batch_size=2), 3)
+
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(ArchivedNotification.objects.count(), 3)
+        self.assertEqual(get_counts(self.user.pk), {'total': 3, 'unread': 2})
+        self.assertEqual(
+            ArchivedNotification.objects.filter(payload__reward_name='Mukofot', recipient=self.user).count(), 3
+        )
+        self.assertEqual(archive_notifications(), 0)
+
+    def test_rows_without_a_snapshot_are_archived_with_one(self):
+        Notification.objects.update(payload={}, payload_version=0)
+
+        archive_notifications()
+
+        self.assertEqual(ArchivedNotification.objects.count(), 3)
+        for archived in ArchivedNotification.objects.all():
+            self.assertEqual(archived.payload['reward_name'], 'Mukofot')
+            self.assertEqual(archived.payload['id'], self.application.pk)
+
+    def test_archive_endpoint_pages_with_a_cursor(self):
+        archive_notifications()
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        ids = []
+        url = reverse('notification-archive') + '?page_size=2'
+        while url:
+            with self.assertNumQueries(1):
+                response = client.get(url)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(ids, sorted(ArchivedNotification.objects.values_list('id', flat=True), reverse=True))
+        self.assertEqual(response.data['results'][0]['content_object_data']['reward_name'], 'Mukofot')
+
+        client.force_authenticate(self.create_user(99))
+        self.assertEqual(client.get(reverse('notification-archive')).data['results'], [])
+
+
+class ReadWatermarkTests(NotificationTestMixin, TestCase):
+
+    def setUp(self):
+        count_cache.clear()
+        lock_cache.set(DRAIN_SCHEDULED_KEY, True, 60)
+        reward = Reward.objects.create(name='Mukofot', description='Tavsif', image='rewards/test.png')
+        self.application = self.create_applications(1, reward)[0]
+        self.user = self.application.user
+        for _ in range(30):
+            NotificationService.create_application_won_notification(self.application)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_mark_all_moves_the_watermark_without_touching_rows(self):
+        get_counts(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notifications-mark-all-read'), {}, format='json')
+        self.assertEqual((response.data['updated_count'], response.data['total_unread_before']), (31, 31))
+        self.assertFalse(Notification.objects.filter(read_at__isnull=False).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                NotificationService.create_application_won_notification(self.application)
+
+        # The newest id and the watermark UPDATE, however long the history
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(2):
+                response = self.client.post(reverse('notifications-mark-all-read'), {}, format='json')
+        self.assertEqual(response.data['updated_count'], 5)
+        self.assertEqual(
+            NotificationReadState.objects.get(user=self.user).read_up_to_id,
+            Notification.objects.latest('pk').pk
+        )
+
+        newest = NotificationService.create_application_rejected_notification(self.application)
+        response = self.client.get(reverse('notification-list'), {'page_size': 100})
+        unread = [item['id'] for item in response.data['results'] if not item['is_read']]
+        self.assertEqual(unread, [newest.pk])
+
+        count_cache.clear()
+        self.assertEqual(get_counts(self.user.pk), {'total': 37, 'unread': 1})
+
+        # Reads out of order still use read_at
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('notifications-mark-all-read'), {'notification_ids': [newest.pk]}, format='json'
+            )
+        self.assertEqual(response.data['updated_count'], 1)
+        self.assertEqual(get_counts(self.user.pk), {'total': 37, 'unread': 0})
+
+        # Pending notifications are covered by the watermark too
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.create_application_won_notification(self.application)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notifications-mark-all-read'), {}, format='json')
+        self.assertEqual(get_counts(self.user.pk), {'total': 38, 'unread': 0})
+
+    def test_unannotated_notifications_use_the_watermark(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notifications-mark-all-read'), {}, format='json')
+        get_counts(self.user.pk)
+
+        notification = Notification.objects.earliest('pk')
+        self.assertTrue(notification.is_read)
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.mark_as_read()
+        self.assertIsNone(notification.read_at)
+        self.assertEqual(get_counts(self.user.pk)['unread'], 0)
+
+        admin = CustomUser.objects.create_superuser('admin@example.com', '+998900000099', password='parol')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:notifications_notification_changelist'))
+        self.assertContains(response, 'icon-yes.svg')
+        self.assertNotContains(response, 'icon-no.svg')
+
+    def test_watermark_reads_survive_archival(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notifications-mark-all-read'), {}, format='json')
+        Notification.objects.update(status='sent', created_time=timezone.now() - timedelta(days=400))
+
+        archive_notifications()
+        self.assertFalse(ArchivedNotification.objects.filter(read_at__isnull=True).exists())
+        self.assertEqual(ArchivedNotification.objects.count(), 31)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import stream, views
 
 urlpatterns = [
     path('list/', views.NotificationListView.as_view(), name='notification-list'),
@@ -14,4 +14,10 @@ urlpatterns = [
 
     # Stats endpoint
     path('stats/', views.NotificationStatsView.as_view(), name='notification-stats'),
+
+    # Notifications archived by the retention policy
+    path('archive/', views.ArchivedNotificationListView.as_view(), name='notification-archive'),
+
+    # Server-Sent Events: new notifications and unread count changes
+    path('stream/', stream.notification_stream, name='notification-stream'),
 ]
\ No newline at end of file
@@ -6,23 +6,43 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.utils import timezone
 
-from .models import Notification
+from .counters import adjust, get_counts
+from .models import ArchivedNotification, Notification
+from .payloads import is_live, needs_live_payload
+from .pubsub import publish_read
+from .read_state import mark_all_read, unread_q, with_read_state
 from .serializers import (
+    ArchivedNotificationSerializer,
     NotificationSerializer,
     NotificationListSerializer,
     MarkAsReadSerializer,
-    NotificationStatsSerializer
+    NotificationStatsSerializer,
+    resolve_content_objects
 )
 
 
+class CountedPaginator(Paginator):
+    """Paginator that takes an already known total instead of running COUNT"""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
 class NotificationPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    known_count = None  # set by the view from the cached counters
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountedPaginator(object_list, per_page, count=self.known_count)
 
 
 # class NotificationViewSet(ModelViewSet):
@@ -191,22 +211,19 @@ class NotificationListView(generics.ListAPIView):
     pagination_class = NotificationPagination
 
     def get_queryset(self):
-        queryset = Notification.objects.filter(
-            recipient=self.request.user
-        ).select_related('content_type').prefetch_related('content_object')
+        # content_object_data comes from payload snapshots; live content objects are resolved per page
+        queryset = with_read_state(Notification.objects.filter(recipient=self.request.user))
 
         return queryset.order_by('-created_time')
 
     def list(self, request, *args, **kwargs):
         """Enhanced list with notification stats"""
         queryset = self.get_queryset()
-        total_count = Notification.objects.filter(recipient=request.user).count()
-        unread_count = Notification.objects.filter(
-            recipient=request.user,
-            read_at__isnull=True
-        ).count()
+        counts = get_counts(request.user.pk)
+        total_count, unread_count = counts['total'], counts['unread']
 
         # Paginate
+        self.paginator.known_count = total_count
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -240,10 +257,12 @@ class NotificationDetailView(generics.RetrieveAPIView):
 
         if getattr(self, 'swagger_fake_view', False):
             return Notification.objects.none()
-        return Notification.objects.filter(recipient=self.request.user)
+        return with_read_state(Notification.objects.filter(recipient=self.request.user))
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        if needs_live_payload(instance, is_live(request)):
+            resolve_content_objects([instance])
         was_unread = not instance.is_read
 
         # Mark as read when accessing detail
@@ -262,7 +281,7 @@ class MarkNotificationAsReadView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return with_read_state(Notification.objects.filter(recipient=self.request.user))
 
     def patch(self, request, *args, **kwargs):
         notification = get_object_or_404(self.get_queryset(), pk=kwargs['pk'])
@@ -290,19 +309,25 @@ class MarkAllNotificationsAsReadView(generics.GenericAPIView):
 
         notification_ids = serializer.validated_data.get('notification_ids', [])
 
-        # Get unread notifications
-        unread_notifications = Notification.objects.filter(
-            recipient=request.user,
-            read_at__isnull=True
-        )
-
-        # If specific IDs provided, filter by them
-        if notification_ids:
-            unread_notifications = unread_notifications.filter(id__in=notification_ids)
-
-        # Count and update
-        count_before = unread_notifications.count()
-        updated_count = unread_notifications.update(read_at=timezone.now())
+        if not notification_ids:
+            # Moves the read watermark instead of updating every unread row
+            updated_count = count_before = mark_all_read(request.user)
+        else:
+            # Reads out of order are flagged one by one
+            unread_notifications = Notification.objects.filter(
+                unread_q(),
+                recipient=request.user,
+                id__in=notification_ids
+            )
+
+            counts = unread_notifications.aggregate(
+                unread=Count('id'), delivered=Count('id', filter=Q(status='sent'))
+            )
+            count_before = counts['unread']
+            updated_count = unread_notifications.update(read_at=timezone.now())
+            adjust(request.user.pk, unread=-updated_count)
+            # Streams only counted the delivered ones
+            publish_read(request.user.pk, counts['delivered'])
 
         return Response({
             'success': True,
@@ -317,14 +342,36 @@ class NotificationStatsView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user_notifications = Notification.objects.filter(recipient=request.user)
+        counts = get_counts(request.user.pk)
 
-        total_count = user_notifications.count()
-        unread_count = user_notifications.filter(read_at__isnull=True).count()
+        total_count = counts['total']
+        unread_count = counts['unread']
         read_count = total_count - unread_count
 
         return Response({
             'total_count': total_count,
             'unread_count': unread_count,
             'read_count': read_count,
-        })
\ No newline at end of file
+        })
+
+
+class ArchivedNotificationPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
+
+
+class ArchivedNotificationListView(generics.ListAPIView):
+    """
+    Notifications moved to the archive by the retention policy, newest first.
+    Cursor paginated: each page is one index range scan, however deep, and no COUNT is run.
+    """
+    serializer_class = ArchivedNotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ArchivedNotificationPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ArchivedNotification.objects.none()
+        return ArchivedNotification.objects.filter(recipient=self.request.user)